@@ -1,13 +1,37 @@
-from flask import Flask
+from flask import Flask, current_app
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from flask_cors import CORS
-from authlib.integrations.flask_client import OAuth
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import sqlite3
+import click
 import os
 
 db = SQLAlchemy()
 login_manager = LoginManager()
-oauth = OAuth()
+
+@event.listens_for(Engine, 'connect')
+def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite ignores foreign keys, ON DELETE CASCADE included, unless enabled per connection
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        dbapi_connection.execute('PRAGMA foreign_keys=ON')
+
+def get_oauth():
+    """Authlib registry with the Google client, built on first use.
+    Importing authlib is a large share of cold-start time and only the Google login routes need it."""
+    app = current_app._get_current_object()
+    oauth = app.extensions.get('fda_oauth')
+    if oauth is None:
+        from authlib.integrations.flask_client import OAuth
+        oauth = OAuth(app)
+        oauth.register(
+            name='google',
+            server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
+            client_kwargs={'scope': 'openid email profile'}
+        )
+        oauth = app.extensions.setdefault('fda_oauth', oauth)
+    return oauth
 
 def create_app():
     app = Flask(__name__)
@@ -18,6 +42,49 @@ def create_app():
     app.config['GOOGLE_CLIENT_SECRET'] = os.environ.get('GOOGLE_CLIENT_SECRET')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+    # OCR ingest: 'vision' (Google Cloud Vision), 'tesseract' (local engine, needs pytesseract),
+    # 'replay' (responses recorded under OCR_REPLAY_DIR) or 'fake' (local JSON fixtures, for testing)
+    app.config['OCR_BACKEND'] = os.environ.get('OCR_BACKEND', 'vision')
+    app.config['OCR_FAKE_LATENCY'] = float(os.environ.get('OCR_FAKE_LATENCY', 0))
+    app.config['OCR_TESSERACT_LANG'] = os.environ.get('OCR_TESSERACT_LANG', 'eng')
+    app.config['OCR_RECORD_DIR'] = os.environ.get('OCR_RECORD_DIR') # save every OCR response here for replay
+    app.config['OCR_REPLAY_DIR'] = os.environ.get('OCR_REPLAY_DIR')
+    # Under load, route OCR to a second backend once this many images are queued or in flight
+    app.config['OCR_OVERFLOW_BACKEND'] = os.environ.get('OCR_OVERFLOW_BACKEND')
+    app.config['OCR_OVERFLOW_DEPTH'] = int(os.environ.get('OCR_OVERFLOW_DEPTH', 16))
+    # Screenshots are cropped to the scoreboard and downscaled to this longest side before OCR (0 = full size)
+    app.config['OCR_MAX_DIMENSION'] = int(os.environ.get('OCR_MAX_DIMENSION', 1600))
+    app.config['OCR_CROP'] = os.environ.get('OCR_CROP', '1') == '1'
+    app.config['OCR_JPEG_QUALITY'] = int(os.environ.get('OCR_JPEG_QUALITY', 90))
+    # Admission control for synchronous uploads: OCR calls at once, waiting room, max wait (s), places per manager
+    app.config['OCR_MAX_CONCURRENT'] = int(os.environ.get('OCR_MAX_CONCURRENT', 4))
+    app.config['OCR_MAX_QUEUE'] = int(os.environ.get('OCR_MAX_QUEUE', 8))
+    app.config['OCR_MAX_WAIT'] = float(os.environ.get('OCR_MAX_WAIT', 10))
+    app.config['OCR_MAX_PER_USER'] = int(os.environ.get('OCR_MAX_PER_USER', 2))
+    app.config['OCR_WORKERS'] = int(os.environ.get('OCR_WORKERS', 2))
+    app.config['OCR_BATCH_SIZE'] = int(os.environ.get('OCR_BATCH_SIZE', 8))
+    app.config['OCR_MAX_FILES'] = int(os.environ.get('OCR_MAX_FILES', 20))
+    # Raw OCR annotations are cached by image hash so re-uploads never hit the OCR backend again (0 disables)
+    app.config['OCR_CACHE_DIR'] = os.environ.get('OCR_CACHE_DIR', os.path.join(app.instance_path, 'ocr_cache'))
+    app.config['OCR_CACHE_MAX_BYTES'] = int(os.environ.get('OCR_CACHE_MAX_BYTES', 200 * 1024 * 1024))
+
+    # Per-user cache for read endpoints. On by default only with RESPONSE_CACHE_URL (redis://...), which all
+    # workers share; RESPONSE_CACHE_ENABLED=1 without it uses an in-process cache, which only sees writes
+    # handled by its own process, so enable that only for single-worker deployments
+    app.config['RESPONSE_CACHE_URL'] = os.environ.get('RESPONSE_CACHE_URL')
+    app.config['RESPONSE_CACHE_ENABLED'] = os.environ.get('RESPONSE_CACHE_ENABLED', '1' if app.config['RESPONSE_CACHE_URL'] else '0') == '1'
+    app.config['RESPONSE_CACHE_TTL'] = int(os.environ.get('RESPONSE_CACHE_TTL', 300))
+    app.config['RESPONSE_CACHE_SIZE'] = int(os.environ.get('RESPONSE_CACHE_SIZE', 1024))
+    # gzip/br bodies of the match endpoints from this size up (see app/compact.py)
+    app.config['RESPONSE_COMPRESS_MIN_BYTES'] = int(os.environ.get('RESPONSE_COMPRESS_MIN_BYTES', 1024))
+    # Logged-in users are cached for this many seconds (0 disables); in the shared cache by default, and only
+    # in-process if set without RESPONSE_CACHE_URL, where other workers see profile changes only after the TTL
+    app.config['USER_CACHE_TTL'] = int(os.environ.get('USER_CACHE_TTL', 60 if app.config['RESPONSE_CACHE_URL'] else 0))
+    app.config['USER_CACHE_SIZE'] = int(os.environ.get('USER_CACHE_SIZE', 1024))
+    # Opt-in request instrumentation: Server-Timing headers, /metrics, N+1 warnings above the query threshold
+    app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', '0') == '1'
+    app.config['METRICS_QUERY_THRESHOLD'] = int(os.environ.get('METRICS_QUERY_THRESHOLD', 30))
+
     # ✅ Required for cross-origin session cookies (Netlify <-> Render login)
     app.config["SESSION_COOKIE_SECURE"] = True
     app.config["SESSION_COOKIE_SAMESITE"] = "None"
@@ -25,13 +92,11 @@ def create_app():
 
     db.init_app(app)
     login_manager.init_app(app)
-    oauth.init_app(app)
 
-    oauth.register(
-        name='google',
-        server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
-        client_kwargs={'scope': 'openid email profile'}
-    )
+    from .response_cache import init_response_cache
+    init_response_cache(app)
+    from .session_users import init_user_cache
+    init_user_cache(app)
 
     # ✅ origins MUST be a list, not a string
     CORS(
@@ -43,15 +108,37 @@ def create_app():
     )
 
     with app.app_context():
-        from .models import User
+        from .session_users import load_session_user
 
         @login_manager.user_loader
         def load_user(user_id):
-            return User.query.get(int(user_id))
+            return load_session_user(user_id)
 
         from .routes import api
         app.register_blueprint(api, url_prefix='/api')
+        from .instrumentation import init_instrumentation
+        init_instrumentation(app, api.name)
+        from .admission import init_admission
+        init_admission(app) # after instrumentation so its gauges reach /metrics
+
+        from .aggregates import rebuild_player_aggregates # also registers the flush hook
+        from .tips import init_tips
+        init_tips(app)
+
+        @app.cli.command('rebuild-aggregates')
+        @click.option('--manager-id', type=int, default=None, help='Only rebuild this manager\'s players.')
+        def rebuild_aggregates_command(manager_id):
+            """Recompute PlayerAggregate totals from PerformanceRecord (backfill)."""
+            count = rebuild_player_aggregates(manager_id)
+            click.echo(f'Rebuilt {count} player aggregates.')
+
+        @app.cli.command('migrate')
+        def migrate_command():
+            """Create missing tables and apply pending schema migrations."""
+            from .migrations import run_migrations
+            applied = run_migrations(echo=click.echo)
+            click.echo(f'{len(applied)} migration(s) applied.' if applied else 'Database is up to date.')
 
-        db.create_all()
+    # No DDL at boot: run `flask migrate` once per deploy to create/upgrade the schema
 
     return app
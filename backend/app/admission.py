@@ -0,0 +1,132 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from flask import current_app
+from .instrumentation import record_queue_wait
+
+# --- OCR ADMISSION CONTROL ---
+# Synchronous uploads hold a worker thread for the whole OCR call. To keep threads
+# free for cheap reads, at most OCR_MAX_CONCURRENT uploads run OCR at once per
+# process, up to OCR_MAX_QUEUE more wait (for at most OCR_MAX_WAIT seconds), and
+# anything beyond that is turned away straight away with Retry-After. One manager
+# can hold at most OCR_MAX_PER_USER of those places, so a single burst can't starve
+# everyone else: going over that is a 429, a full or timed-out queue is a 503.
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, message, status, retry_after):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(self, max_concurrent, max_queue, max_wait, max_per_user=0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.max_per_user = max_per_user
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.total_wait = 0.0
+        self.max_wait_seen = 0.0
+        self.service_time = 1.0 # moving average of how long a slot is held, for Retry-After
+        self._per_user = {}
+        self._cond = threading.Condition()
+
+    def _retry_after(self):
+        # Time for everyone ahead to get through, assuming slots free at the average rate
+        return max(1, math.ceil(self.service_time * (self.waiting + 1) / self.max_concurrent))
+
+    def _release_user(self, user_id):
+        count = self._per_user.get(user_id, 0) - 1
+        if count > 0: self._per_user[user_id] = count
+        else: self._per_user.pop(user_id, None)
+
+    @contextmanager
+    def slot(self, user_id=None):
+        """Blocks until the caller may run OCR; raises AdmissionRejected if it can't be admitted."""
+        started = time.monotonic()
+        with self._cond:
+            if self.max_per_user and self._per_user.get(user_id, 0) >= self.max_per_user:
+                self.rejected += 1
+                raise AdmissionRejected('Too many uploads in progress for this account; try again shortly.', 429, self._retry_after())
+            if self.in_flight >= self.max_concurrent or self.waiting:
+                if self.waiting >= self.max_queue:
+                    self.rejected += 1
+                    raise AdmissionRejected('OCR is busy; try again shortly.', 503, self._retry_after())
+                self.waiting += 1
+                self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+                deadline = started + self.max_wait
+                try:
+                    while self.in_flight >= self.max_concurrent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self.timed_out += 1
+                            self._release_user(user_id)
+                            raise AdmissionRejected('OCR is busy; try again shortly.', 503, self._retry_after())
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+            else:
+                self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+            self.in_flight += 1
+            self.admitted += 1
+            waited = time.monotonic() - started
+            self.total_wait += waited
+            self.max_wait_seen = max(self.max_wait_seen, waited)
+        held_from = time.monotonic()
+        try:
+            yield waited
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+                self._release_user(user_id)
+                self.service_time = 0.8 * self.service_time + 0.2 * (time.monotonic() - held_from)
+                self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'enabled': True, 'in_flight': self.in_flight, 'queue_depth': self.waiting,
+                'max_concurrent': self.max_concurrent, 'max_queue': self.max_queue, 'max_per_user': self.max_per_user,
+                'admitted': self.admitted, 'rejected': self.rejected, 'timed_out': self.timed_out,
+                'avg_wait_ms': round(self.total_wait / self.admitted * 1000, 1) if self.admitted else 0,
+                'max_wait_ms': round(self.max_wait_seen * 1000, 1),
+                'avg_service_ms': round(self.service_time * 1000, 1),
+            }
+
+
+def init_admission(app):
+    limit = app.config.get('OCR_MAX_CONCURRENT', 0)
+    controller = AdmissionController(
+        limit, app.config.get('OCR_MAX_QUEUE', 0), app.config.get('OCR_MAX_WAIT', 10.0), app.config.get('OCR_MAX_PER_USER', 0)
+    ) if limit > 0 else None
+    app.extensions['ocr_admission'] = controller
+    metrics = app.extensions.get('metrics')
+    if controller and metrics:
+        metrics.add_gauge('fda_ocr_in_flight', 'Synchronous OCR calls running.', lambda: controller.in_flight)
+        metrics.add_gauge('fda_ocr_queue_depth', 'Uploads waiting for an OCR slot.', lambda: controller.waiting)
+        metrics.add_gauge('fda_ocr_admission_wait_seconds_total', 'Time admitted uploads spent waiting.', lambda: controller.total_wait, 'counter')
+        metrics.add_gauge('fda_ocr_rejected_total', 'Uploads turned away (429/503).', lambda: controller.rejected + controller.timed_out, 'counter')
+
+
+@contextmanager
+def ocr_admission(user_id):
+    """Admission for one synchronous OCR call; a no-op when OCR_MAX_CONCURRENT is 0."""
+    controller = current_app.extensions.get('ocr_admission')
+    if controller is None:
+        yield 0.0
+        return
+    with controller.slot(user_id) as waited:
+        record_queue_wait(waited)
+        yield waited
+
+
+def admission_stats():
+    controller = current_app.extensions.get('ocr_admission')
+    return controller.stats() if controller else {'enabled': False}
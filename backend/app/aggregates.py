@@ -0,0 +1,158 @@
+from collections import defaultdict
+from sqlalchemy import event, func, case, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from . import db
+from .models import MatchEvent, PerformanceRecord, PlayerAggregate, ign_key
+
+# --- PER-PLAYER RUNNING AGGREGATES ---
+# PlayerAggregate holds running sums per (manager, player) so /stats/overview is a
+# single-row lookup. A before_flush hook turns every pending change to
+# PerformanceRecord (insert, edit, IGN rename, delete incl. cascades) and to
+# MatchEvent.team_rank into +/- deltas, applied as `col = col + delta` statements in
+# the same transaction. Missing stats count as 0. Deleting a match whose performances
+# were never loaded (passive_deletes; the database cascades) subtracts its SQL totals.
+# Bulk Query.update()/delete() bypass the hook; such code paths must call
+# apply_deltas() themselves or rebuild_player_aggregates() afterwards. Positive deltas
+# are upserts (INSERT ... ON CONFLICT DO UPDATE) so two transactions creating the same
+# player's row at once both succeed.
+
+STAT_FIELDS = ['kills', 'assists', 'damage', 'revives', 'recall', 'survival_time_sec', 'rating']
+SUM_COLUMNS = ['sum_' + f for f in STAT_FIELDS]
+UPSERT_INSERTS = {'postgresql': postgresql.insert, 'sqlite': sqlite.insert}
+
+
+def _value(state, attr, old):
+    """Current value of an attribute, or the value it had when loaded if old=True."""
+    if old:
+        history = state.attrs[attr].history
+        if history.deleted: return history.deleted[0]
+    return getattr(state.obj(), attr)
+
+
+def match_for_record(session, record):
+    match = record.match_event
+    if match is None and record.match_id is not None:
+        match = session.get(MatchEvent, record.match_id)
+    return match
+
+
+def _contribution(session, record, old):
+    """(manager_id, key, [1, win, *stats]) for a record's old or current state."""
+    state = inspect(record)
+    match = match_for_record(session, record)
+    if match is None: return None
+    match_state = inspect(match)
+    manager_id = _value(match_state, 'uploaded_by_id', old)
+    if manager_id is None: return None
+    rank = _value(match_state, 'team_rank', old)
+    won = 1 if rank is not None and int(rank) == 1 else 0 # int(): the column stores "1" as 1, so count it as a win too
+    stats = [_value(state, f, old) or 0 for f in STAT_FIELDS]
+    return manager_id, ign_key(_value(state, 'player_ign', old)), [1, won] + stats
+
+
+def _add(deltas, contribution, sign):
+    if contribution is None: return
+    manager_id, key, values = contribution
+    row = deltas[(manager_id, key)]
+    for i, v in enumerate(values): row[i] += sign * v
+
+
+def performance_totals(connection, condition):
+    """{(manager_id, key): [matches, wins, *sums]} over the performances matching a Core condition."""
+    perf, match = PerformanceRecord.__table__, MatchEvent.__table__
+    query = select(
+        match.c.uploaded_by_id, perf.c.player_ign_norm, func.count(perf.c.id),
+        func.coalesce(func.sum(case((match.c.team_rank == 1, 1), else_=0)), 0),
+        *[func.coalesce(func.sum(perf.c[f]), 0) for f in STAT_FIELDS]
+    ).select_from(perf.join(match, perf.c.match_id == match.c.id)).where(
+        condition, match.c.uploaded_by_id.isnot(None), perf.c.player_ign_norm.isnot(None)
+    ).group_by(match.c.uploaded_by_id, perf.c.player_ign_norm)
+    return {(owner_id, key): values for owner_id, key, *values in connection.execute(query)}
+
+
+def collect_deltas(session):
+    deltas = defaultdict(lambda: [0] * (2 + len(STAT_FIELDS)))
+    handled = set()
+    for obj in session.new:
+        if isinstance(obj, PerformanceRecord):
+            _add(deltas, _contribution(session, obj, old=False), +1)
+            handled.add(obj)
+    for obj in session.deleted:
+        if isinstance(obj, PerformanceRecord):
+            _add(deltas, _contribution(session, obj, old=True), -1)
+            handled.add(obj)
+        elif isinstance(obj, MatchEvent) and 'performances' not in inspect(obj).dict and obj.id is not None:
+            totals = performance_totals(session.connection(), PerformanceRecord.__table__.c.match_id == obj.id)
+            for (manager_id, key), values in totals.items(): _add(deltas, (manager_id, key, values), -1)
+    for obj in session.dirty:
+        if isinstance(obj, PerformanceRecord) and session.is_modified(obj) and obj not in handled:
+            _add(deltas, _contribution(session, obj, old=True), -1)
+            _add(deltas, _contribution(session, obj, old=False), +1)
+            handled.add(obj)
+    for obj in session.dirty:
+        # A rank change flips the win flag for every player in that match
+        if isinstance(obj, MatchEvent) and obj not in session.deleted:
+            state = inspect(obj)
+            if state.attrs.team_rank.history.deleted or state.attrs.uploaded_by_id.history.deleted:
+                for record in obj.performances:
+                    if record in handled: continue
+                    _add(deltas, _contribution(session, record, old=True), -1)
+                    _add(deltas, _contribution(session, record, old=False), +1)
+    return {k: v for k, v in deltas.items() if any(v)}
+
+
+def apply_deltas(connection, deltas):
+    table = PlayerAggregate.__table__
+    upsert = UPSERT_INSERTS.get(connection.dialect.name)
+    for (manager_id, key), (matches, wins, *sums) in deltas.items():
+        where = (table.c.manager_id == manager_id) & (table.c.player_ign_key == key)
+        increments = {'matches': table.c.matches + matches, 'wins': table.c.wins + wins}
+        increments.update({col: table.c[col] + v for col, v in zip(SUM_COLUMNS, sums)})
+        if matches > 0:
+            values = {'manager_id': manager_id, 'player_ign_key': key, 'matches': matches, 'wins': wins}
+            values.update(zip(SUM_COLUMNS, sums))
+            if upsert is not None:
+                connection.execute(upsert(table).values(**values).on_conflict_do_update(
+                    index_elements=[table.c.manager_id, table.c.player_ign_key], set_=increments))
+            elif connection.execute(table.update().where(where).values(**increments)).rowcount == 0:
+                connection.execute(table.insert().values(**values))
+        else:
+            connection.execute(table.update().where(where).values(**increments))
+            if matches < 0:
+                connection.execute(table.delete().where(where & (table.c.matches <= 0)))
+
+
+@event.listens_for(Session, 'before_flush')
+def _update_player_aggregates(session, flush_context, instances):
+    with session.no_autoflush:
+        deltas = collect_deltas(session)
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+def rebuild_player_aggregates(manager_id=None, connection=None):
+    """Recomputes PlayerAggregate from scratch (backfill, or repair after bulk SQL).
+    Runs on the given connection, or on the session's transaction and commits it."""
+    perf, match, table = PerformanceRecord.__table__, MatchEvent.__table__, PlayerAggregate.__table__
+    sums = [func.coalesce(func.sum(perf.c[f]), 0) for f in STAT_FIELDS]
+    query = select(
+        match.c.uploaded_by_id, perf.c.player_ign_norm, func.count(perf.c.id),
+        func.coalesce(func.sum(case((match.c.team_rank == 1, 1), else_=0)), 0), *sums
+    ).select_from(perf.join(match, perf.c.match_id == match.c.id)).where(
+        match.c.uploaded_by_id.isnot(None), perf.c.player_ign_norm.isnot(None)
+    ).group_by(match.c.uploaded_by_id, perf.c.player_ign_norm)
+    delete = table.delete()
+    if manager_id is not None:
+        query = query.where(match.c.uploaded_by_id == manager_id)
+        delete = delete.where(table.c.manager_id == manager_id)
+
+    conn = connection if connection is not None else db.session.connection()
+    rows = [
+        dict(manager_id=owner_id, player_ign_key=key, matches=count, wins=wins, **dict(zip(SUM_COLUMNS, values)))
+        for owner_id, key, count, wins, *values in conn.execute(query)
+    ]
+    conn.execute(delete)
+    if rows: conn.execute(table.insert(), rows)
+    if connection is None: db.session.commit()
+    return len(rows)
@@ -0,0 +1,37 @@
+from sqlalchemy import select
+from . import db
+from .models import MatchEvent, PerformanceRecord
+from .aggregates import apply_deltas, performance_totals
+
+# --- SET-BASED MATCH DELETION ---
+# Deleting matches through the ORM loads every performance just to delete it. Here a
+# manager's matches (by id and/or date range) go in a handful of statements: one
+# GROUP BY for the aggregate deltas, one DELETE for their performances, one for the
+# matches. performance_record.match_id is ON DELETE CASCADE as a backstop, but the
+# child DELETE is explicit so databases that haven't run that migration stay clean.
+# These statements bypass the flush hook, so PlayerAggregate is updated here.
+
+MAX_DELETE_IDS = 1000
+
+
+def delete_matches(manager_id, match_ids=None, date_from=None, date_to_exclusive=None):
+    """Deletes the manager's matches matching every given filter and commits.
+    Returns (ids deleted, performances deleted)."""
+    m, p = MatchEvent.__table__, PerformanceRecord.__table__
+    conditions = [m.c.uploaded_by_id == manager_id] # other managers' ids simply don't match
+    if match_ids is not None: conditions.append(m.c.id.in_(match_ids))
+    if date_from: conditions.append(m.c.match_date >= date_from)
+    if date_to_exclusive: conditions.append(m.c.match_date < date_to_exclusive)
+    owned = select(m.c.id).where(*conditions)
+
+    conn = db.session.connection()
+    ids = conn.execute(owned).scalars().all()
+    if not ids: return [], 0
+
+    deltas = {key: [-v for v in values] for key, values in performance_totals(conn, p.c.match_id.in_(owned)).items()}
+
+    performances = conn.execute(p.delete().where(p.c.match_id.in_(owned))).rowcount
+    conn.execute(m.delete().where(*conditions))
+    apply_deltas(conn, deltas)
+    db.session.commit()
+    return ids, performances
@@ -0,0 +1,166 @@
+import csv
+import io
+import json
+import time
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import insert
+from . import db
+from .models import MatchEvent, PerformanceRecord, ign_key
+from .ingest import manual_performance_values
+from .aggregates import apply_deltas, STAT_FIELDS
+from .tips import compute_tip_codes
+from .recommendation_engine import THRESHOLDS_VERSION
+
+# --- BULK HISTORICAL IMPORT ---
+# Input is CSV or NDJSON. Flat rows carry one performance each plus match columns
+# (match_ref, match_date, map_name, team_rank); rows sharing a match_ref form one
+# match. NDJSON lines may instead be whole matches shaped like the /add-manual-match
+# payload (map_name, team_rank, match_date, performances: [...]).
+# Performances use the same conversions as /add-manual-match. Bad rows are reported
+# and skipped; matches are written with executemany inserts, CHUNK_SIZE matches per
+# transaction, and PlayerAggregate is updated from the same values.
+
+CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 1000
+
+
+def _clean(row):
+    # Spreadsheet exports leave empty cells; treat them as missing so defaults apply
+    return {k.strip(): v.strip() if isinstance(v, str) else v for k, v in row.items() if k and v not in ('', None)}
+
+
+def _parse_match_date(value):
+    if not value: return None
+    if isinstance(value, str) and len(value) == 10: return datetime.strptime(value, '%Y-%m-%d')
+    return datetime.fromisoformat(value)
+
+
+def read_rows(stream, fmt):
+    """Yields (line number, dict) for every record in the upload."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        for line_no, row in enumerate(csv.DictReader(text), start=2): # line 1 is the header
+            yield line_no, _clean(row)
+    else:
+        for line_no, line in enumerate(text, start=1):
+            if not line.strip(): continue
+            try: record = json.loads(line)
+            except ValueError: record = None
+            yield line_no, record
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows_read = 0
+        self.matches_imported = 0
+        self.performances_imported = 0
+        self.error_count = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    def error(self, line, message, match_ref=None):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'match_ref': match_ref, 'error': message})
+
+    def to_dict(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            'rows_read': self.rows_read, 'matches_imported': self.matches_imported,
+            'performances_imported': self.performances_imported, 'error_count': self.error_count,
+            'errors': self.errors, 'elapsed_sec': round(elapsed, 3),
+            'rows_per_sec': round(self.rows_read / elapsed, 1) if elapsed > 0 else None
+        }
+
+
+def _collect_matches(rows, report):
+    """Validates records and groups them into {match_ref: match dict}, preserving file order."""
+    matches = {}
+
+    def match_for(line, ref, record):
+        try:
+            team_rank = int(record['team_rank'])
+            match_date = _parse_match_date(record.get('match_date'))
+        except KeyError:
+            report.error(line, 'team_rank is required.', ref)
+            return None
+        except (ValueError, TypeError):
+            report.error(line, 'Invalid team_rank or match_date (use YYYY-MM-DD or ISO 8601).', ref)
+            return None
+        match = matches.get(ref)
+        if match is None:
+            match = matches[ref] = {'map_name': record.get('map_name'), 'team_rank': team_rank, 'match_date': match_date, 'performances': []}
+        elif match['team_rank'] != team_rank:
+            report.error(line, f'team_rank differs from earlier rows of match {ref}.', ref)
+            return None
+        return match
+
+    def add_performance(line, ref, match, p):
+        if not p.get('player_ign'):
+            report.error(line, 'player_ign is required.', ref)
+            return
+        if any(values['player_ign'] == p['player_ign'] for values in match['performances']):
+            report.error(line, f"Duplicate player_ign {p['player_ign']!r} in this match.", ref)
+            return
+        try:
+            match['performances'].append(manual_performance_values(p))
+        except (ValueError, TypeError):
+            report.error(line, 'Invalid data format for stats.', ref)
+
+    for line, record in rows:
+        report.rows_read += 1
+        if not isinstance(record, dict):
+            report.error(line, 'Not a valid JSON object.')
+            continue
+        if isinstance(record.get('performances'), list): # whole-match NDJSON line
+            ref = f"line-{line}" if record.get('match_ref') is None else str(record['match_ref'])
+            match = match_for(line, ref, record)
+            if match is None: continue
+            for p in record['performances']:
+                if isinstance(p, dict): add_performance(line, ref, match, _clean(p))
+                else: report.error(line, 'Each performance must be an object.', ref)
+        else:
+            ref = record.get('match_ref')
+            if ref is None:
+                report.error(line, 'match_ref is required to group rows into matches.')
+                continue
+            ref = str(ref)
+            match = match_for(line, ref, record)
+            if match is not None: add_performance(line, ref, match, record)
+    return [m for m in matches.values() if m['performances']]
+
+
+def _insert_chunk(manager_id, chunk, report):
+    now = datetime.utcnow()
+    match_rows = [{'uploaded_by_id': manager_id, 'map_name': m['map_name'], 'team_rank': m['team_rank'], 'match_date': m['match_date'] or now} for m in chunk]
+    match_ids = db.session.execute(
+        insert(MatchEvent).returning(MatchEvent.id, sort_by_parameter_order=True), match_rows
+    ).scalars().all()
+
+    performance_rows = []
+    deltas = defaultdict(lambda: [0] * (2 + len(STAT_FIELDS)))
+    for match_id, match in zip(match_ids, chunk):
+        won = 1 if match['team_rank'] == 1 else 0
+        for values in match['performances']:
+            performance_rows.append(dict(values, match_id=match_id, player_ign_norm=ign_key(values['player_ign']), team_rank=match['team_rank']))
+            delta = deltas[(manager_id, ign_key(values['player_ign']))]
+            for i, v in enumerate([1, won] + [values[f] for f in STAT_FIELDS]): delta[i] += v
+    # Tip codes for the whole chunk in one vectorized pass
+    for row, codes in zip(performance_rows, compute_tip_codes(performance_rows)):
+        row.update(tip_codes=codes, tips_version=THRESHOLDS_VERSION)
+        del row['team_rank']
+    connection = db.session.connection()
+    connection.execute(PerformanceRecord.__table__.insert(), performance_rows)
+    apply_deltas(connection, deltas) # Core inserts skip the flush hook, so keep aggregates in step here
+    db.session.commit()
+    report.matches_imported += len(chunk)
+    report.performances_imported += len(performance_rows)
+
+
+def import_matches(manager_id, stream, fmt):
+    report = ImportReport()
+    matches = _collect_matches(read_rows(stream, fmt), report)
+    for start in range(0, len(matches), CHUNK_SIZE):
+        _insert_chunk(manager_id, matches[start:start + CHUNK_SIZE], report)
+    return report
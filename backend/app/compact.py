@@ -0,0 +1,65 @@
+import gzip
+import json
+from functools import wraps
+from flask import current_app, request, make_response
+
+# --- COMPACT RESPONSES ---
+# `?format=columnar` on the match endpoints returns column arrays instead of one object
+# per row, so key strings are written once per payload rather than once per row. These
+# bodies are encoded with orjson when it is installed (stdlib json otherwise). Views
+# wrapped in @negotiate_encoding gzip or brotli (br needs the optional `brotli` package)
+# bodies of at least RESPONSE_COMPRESS_MIN_BYTES when the client accepts it. The
+# decorator sits above @cached_response, so the cache keeps one uncompressed body per
+# URL; compressed variants carry the weak form of its ETag.
+
+COLUMNAR = 'columnar'
+
+try:
+    import orjson
+except ImportError: # optional dependency
+    orjson = None
+
+try:
+    import brotli
+except ImportError: # optional dependency
+    brotli = None
+
+
+def wants_columnar():
+    return request.args.get('format') == COLUMNAR
+
+
+def dumps(payload):
+    if orjson is not None: return orjson.dumps(payload)
+    return json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode()
+
+
+def compact_response(payload, status=200):
+    response = make_response(dumps(payload), status)
+    response.mimetype = 'application/json'
+    return response
+
+
+def _encode(body, accepted):
+    if brotli is not None and accepted['br']: return 'br', brotli.compress(body, quality=5)
+    if accepted['gzip']: return 'gzip', gzip.compress(body, compresslevel=6)
+    return None, body
+
+
+def negotiate_encoding(view):
+    """Compresses the view's 200 responses per Accept-Encoding. Place above @cached_response."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        response = make_response(view(*args, **kwargs))
+        response.vary.add('Accept-Encoding')
+        if (response.status_code != 200 or response.direct_passthrough or 'Content-Encoding' in response.headers
+                or response.content_length is None or response.content_length < current_app.config.get('RESPONSE_COMPRESS_MIN_BYTES', 1024)):
+            return response
+        encoding, body = _encode(response.get_data(), request.accept_encodings)
+        if encoding is None: return response
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        etag, _ = response.get_etag()
+        if etag: response.set_etag(etag, weak=True) # same entity, different bytes
+        return response
+    return wrapper
@@ -0,0 +1,112 @@
+import csv
+import importlib.util
+import io
+import json
+from sqlalchemy import select
+from . import db
+from .models import MatchEvent, PerformanceRecord
+
+# --- STREAMING BULK EXPORT ---
+# One row per performance, joined with its match. Rows come off a server-side cursor
+# in chunks of CHUNK_SIZE (yield_per) and each chunk is encoded and yielded straight
+# away, so memory stays flat however long the history is.
+
+CHUNK_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    'match_id', 'match_date', 'map_name', 'team_rank', 'performance_id', 'player_ign',
+    'kills', 'assists', 'damage', 'revives', 'survival_time_sec', 'recall', 'rating'
+]
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def export_query(manager_id, map_name=None, date_from=None, date_to_exclusive=None):
+    m, p = MatchEvent.__table__, PerformanceRecord.__table__
+    stmt = select(
+        m.c.id, m.c.match_date, m.c.map_name, m.c.team_rank, p.c.id, p.c.player_ign,
+        p.c.kills, p.c.assists, p.c.damage, p.c.revives, p.c.survival_time_sec, p.c.recall, p.c.rating
+    ).select_from(p.join(m, p.c.match_id == m.c.id)).where(m.c.uploaded_by_id == manager_id)
+    if map_name: stmt = stmt.where(m.c.map_name == map_name)
+    if date_from: stmt = stmt.where(m.c.match_date >= date_from)
+    if date_to_exclusive: stmt = stmt.where(m.c.match_date < date_to_exclusive)
+    return stmt.order_by(m.c.match_date, m.c.id, p.c.id)
+
+
+def _chunks(stmt):
+    result = db.session.execute(stmt.execution_options(yield_per=CHUNK_SIZE))
+    for partition in result.partitions():
+        yield [(r[0], r[1].isoformat() if r[1] else None) + tuple(r[2:]) for r in partition]
+
+
+def stream_csv(stmt):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in _chunks(stmt):
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell(): yield buffer.getvalue()
+
+
+def stream_ndjson(stmt):
+    for rows in _chunks(stmt):
+        yield ''.join(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + '\n' for row in rows)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands back whatever was written since the last drain()."""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def stream_parquet(stmt):
+    """One Parquet row group per chunk. Needs the optional pyarrow dependency."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    schema = pa.schema([
+        ('match_id', pa.int64()), ('match_date', pa.string()), ('map_name', pa.string()), ('team_rank', pa.int64()),
+        ('performance_id', pa.int64()), ('player_ign', pa.string()), ('kills', pa.int64()), ('assists', pa.int64()),
+        ('damage', pa.int64()), ('revives', pa.int64()), ('survival_time_sec', pa.float64()), ('recall', pa.int64()),
+        ('rating', pa.float64()),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    for rows in _chunks(stmt):
+        columns = list(zip(*rows))
+        writer.write_table(pa.Table.from_arrays([pa.array(col, type=field.type) for col, field in zip(columns, schema)], schema=schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def parquet_available():
+    # find_spec of a submodule imports its parent, so check pyarrow itself first
+    return importlib.util.find_spec('pyarrow') is not None and importlib.util.find_spec('pyarrow.parquet') is not None
+
+
+STREAMERS = {'csv': stream_csv, 'ndjson': stream_ndjson, 'parquet': stream_parquet}
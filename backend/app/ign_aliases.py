@@ -0,0 +1,87 @@
+from sqlalchemy import select, exists, func
+from . import db
+from .models import MatchEvent, PerformanceRecord, RosterPlayer, PlayerAlias, ign_key
+from .aggregates import apply_deltas, performance_totals
+from .ign_matcher import invalidate_roster_matcher
+
+# --- IGN ALIASES AND SET-BASED MERGES ---
+# A PlayerAlias maps a name OCR (or a manager) keeps getting wrong to the canonical
+# IGN; the roster matcher consults them before fuzzy matching. merge_players() folds
+# one or more IGNs into a canonical one for a manager in a single transaction: one
+# UPDATE rewrites every matching performance, one renames the surviving roster row
+# (any other rows for the merged names are deleted rather than left as duplicates),
+# and each merged name is saved as an alias so future uploads land on the canonical
+# IGN. The UPDATE bypasses the flush hook, so PlayerAggregate is moved here. A record
+# whose match already has a row for the target (or an earlier row being merged) is left
+# as it was, since a match holds one row per player; those are counted as skipped.
+
+MAX_MERGE_SOURCES = 100
+
+
+def save_aliases(manager_id, aliases, canonical_ign):
+    """Points each alias at `canonical_ign` (caller commits); aliases that pointed at one of them follow.
+    Returns how many aliases were saved."""
+    keys = {ign_key(alias): alias for alias in aliases}
+    keys.pop(ign_key(canonical_ign), None)
+    existing = {a.alias_key: a for a in PlayerAlias.query.filter_by(manager_id=manager_id)}
+    for entry in existing.values():
+        if ign_key(entry.canonical_ign) in keys: entry.canonical_ign = canonical_ign
+    if ign_key(canonical_ign) in existing: db.session.delete(existing[ign_key(canonical_ign)]) # a canonical name can't be an alias
+    for key, alias in keys.items():
+        entry = existing.get(key)
+        if entry is None:
+            entry = PlayerAlias(manager_id=manager_id, alias_key=key)
+            db.session.add(entry)
+        entry.alias, entry.canonical_ign = alias, canonical_ign
+    return len(keys)
+
+
+def merge_players(manager_id, sources, target):
+    """Rewrites the manager's performances and roster from every IGN in `sources` (case-insensitive)
+    to `target`, records the sources as aliases and commits. Returns the affected row counts."""
+    target_key = ign_key(target)
+    source_keys = {ign_key(s) for s in sources}
+    m, p, r = MatchEvent.__table__, PerformanceRecord.__table__, RosterPlayer.__table__
+    owned = select(m.c.id).where(m.c.uploaded_by_id == manager_id)
+    conn = db.session.connection()
+
+    other = p.alias('other')
+    conflict = exists().where(other.c.match_id == p.c.match_id, other.c.id != p.c.id, (other.c.player_ign == target) | (
+        other.c.player_ign_norm.in_(source_keys) & (other.c.player_ign != target) & (other.c.id < p.c.id)))
+    selected = p.c.player_ign_norm.in_(source_keys) & (p.c.player_ign != target)
+    skipped = conn.execute(select(func.count()).select_from(p.join(m, p.c.match_id == m.c.id)).where(
+        m.c.uploaded_by_id == manager_id, selected, conflict)).scalar()
+
+    # Aggregates: move the totals of every other key onto the target's (case-only renames keep their key)
+    moved = source_keys - {target_key}
+    deltas = {}
+    if moved:
+        condition = (m.c.uploaded_by_id == manager_id) & p.c.player_ign_norm.in_(moved) & ~conflict
+        gained = None
+        for key, values in performance_totals(conn, condition).items():
+            deltas[key] = [-v for v in values]
+            gained = values if gained is None else [a + b for a, b in zip(gained, values)]
+        if gained: deltas[(manager_id, target_key)] = gained
+
+    performances = conn.execute(p.update().where(p.c.match_id.in_(owned), selected, ~conflict)
+                                .values(player_ign=target, player_ign_norm=target_key)).rowcount
+    apply_deltas(conn, deltas)
+
+    # Roster: keep the exact target row if there is one, else rename the oldest matching row
+    rows = [(id, ign) for id, ign in conn.execute(select(r.c.id, r.c.player_ign).where(r.c.manager_id == manager_id).order_by(r.c.id))
+            if ign_key(ign) in source_keys | {target_key}]
+    keep = next((row for row in rows if row[1] == target), rows[0] if rows else None)
+    renamed = removed = 0
+    if keep and keep[1] != target:
+        renamed = conn.execute(r.update().where(r.c.id == keep[0]).values(player_ign=target)).rowcount
+    duplicates = [id for id, _ in rows if id != keep[0]] if keep else []
+    if duplicates:
+        removed = conn.execute(r.delete().where(r.c.id.in_(duplicates))).rowcount
+
+    aliases = save_aliases(manager_id, sources, target)
+    db.session.commit()
+    invalidate_roster_matcher(manager_id)
+    return {
+        'into': target, 'performances_updated': performances, 'performances_skipped': skipped,
+        'roster_renamed': renamed, 'roster_removed': removed, 'aliases_saved': aliases,
+    }
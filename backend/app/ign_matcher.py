@@ -0,0 +1,129 @@
+import threading
+import unicodedata
+from collections import Counter
+from difflib import SequenceMatcher
+import numpy as np
+from .models import RosterPlayer, PlayerAlias, ign_key
+
+# --- ROSTER IGN MATCHING ---
+# A RosterMatcher is built once per manager and reused until the roster changes.
+# best_match() returns exactly what difflib.get_close_matches(word, roster, n=1, cutoff)
+# would, but prunes candidates with the same length / character-count bounds difflib
+# uses (real_quick_ratio / quick_ratio), visits them best-bound-first and stops as soon
+# as no remaining candidate can beat the best full ratio found.
+# Only when that finds nothing does it fall back to a normalized (case-folded,
+# homoglyph-mapped) exact lookup, which catches OCR slips like "ALPHA" or "A1pha".
+# The manager's PlayerAlias rows are checked before any of that: a known alias maps
+# straight to its canonical IGN, whether or not it would have matched fuzzily.
+
+HOMOGLYPHS = str.maketrans({
+    '0': 'o', '1': 'l', 'i': 'l', '|': 'l', '!': 'l', '5': 's', '$': 's', '8': 'b', '@': 'a', '3': 'e'
+})
+
+
+def normalize_ign(ign):
+    """Case-folded, homoglyph-mapped form of an IGN, used for lookups only (never stored)."""
+    ign = unicodedata.normalize('NFKC', ign or '').casefold()
+    return ''.join(ign.split()).translate(HOMOGLYPHS)
+
+
+def _ratio_bound(matches, length):
+    # Same arithmetic as difflib's _calculate_ratio so float comparisons agree exactly
+    return np.where(length > 0, 2.0 * matches / np.maximum(length, 1), 1.0)
+
+
+class RosterMatcher:
+    MEMO_SIZE = 1024
+
+    def __init__(self, roster, aliases=None):
+        self.roster = list(dict.fromkeys(roster)) # de-dupe, keep order
+        self.aliases = dict(aliases or {}) # ign_key(alias) -> canonical IGN
+        # Character-count matrix (roster x alphabet) so quick_ratio bounds are one NumPy op per lookup
+        self._alphabet = {c: i for i, c in enumerate(sorted(set(''.join(self.roster))))}
+        self._char_counts = np.zeros((len(self.roster), len(self._alphabet)), dtype=np.int32)
+        for row, ign in enumerate(self.roster):
+            for c, n in Counter(ign).items(): self._char_counts[row, self._alphabet[c]] = n
+        self._lengths = np.array([len(ign) for ign in self.roster], dtype=np.int64)
+        self._normalized = {}
+        for ign in self.roster:
+            self._normalized.setdefault(normalize_ign(ign), []).append(ign)
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, ign):
+        """The canonical IGN if `ign` is a known alias, else `ign` unchanged (manual entry uses this)."""
+        return self.aliases.get(ign_key(ign), ign)
+
+    def best_match(self, word, cutoff, exclude=None):
+        canonical = self.aliases.get(ign_key(word))
+        if canonical is not None: return canonical if canonical != exclude else None
+        key = (word, cutoff, exclude)
+        with self._lock:
+            if key in self._memo: return self._memo[key]
+        match = self._closest(word, cutoff, exclude) or self._normalized_match(word, exclude)
+        with self._lock:
+            if len(self._memo) >= self.MEMO_SIZE: self._memo.clear()
+            self._memo[key] = match
+        return match
+
+    def _closest(self, word, cutoff, exclude):
+        if not self.roster: return None
+        word_len = len(word)
+        word_counts = np.zeros(len(self._alphabet), dtype=np.int32)
+        for c, n in Counter(word).items():
+            if c in self._alphabet: word_counts[self._alphabet[c]] = n
+        length = self._lengths + word_len
+        # real_quick_ratio and quick_ratio for every roster entry at once
+        length_bound = _ratio_bound(np.minimum(self._lengths, word_len), length)
+        count_bound = _ratio_bound(np.minimum(self._char_counts, word_counts).sum(axis=1), length)
+        keep = np.flatnonzero((length_bound >= cutoff) & (count_bound >= cutoff))
+        candidates = sorted(((float(count_bound[i]), self.roster[i]) for i in keep if self.roster[i] != exclude), reverse=True)
+
+        matcher = SequenceMatcher()
+        matcher.set_seq2(word)
+        best_score, best_ign = -1.0, None
+        for bound, ign in candidates:
+            if bound < best_score: break
+            matcher.set_seq1(ign)
+            score = matcher.ratio()
+            # get_close_matches keeps the largest (score, ign) tuple
+            if score >= cutoff and (score, ign) > (best_score, best_ign or ''):
+                best_score, best_ign = score, ign
+        return best_ign
+
+    def _normalized_match(self, word, exclude):
+        found = [ign for ign in self._normalized.get(normalize_ign(word), []) if ign != exclude]
+        return found[0] if len(found) == 1 else None
+
+
+# --- PER-MANAGER CACHE ---
+# Each lookup reads the manager's roster and aliases (two indexed queries, as before the cache)
+# and reuses the cached matcher only if it was built from exactly those rows, so a roster or
+# alias changed by another worker process is picked up on the next upload; what is saved is
+# building the matcher. Routes that change RosterPlayer or PlayerAlias rows still drop this
+# process's entry.
+
+_matchers = {}
+_matchers_lock = threading.Lock()
+
+
+def _roster_fingerprint(manager_id):
+    roster = tuple(ign for (ign,) in RosterPlayer.query.with_entities(RosterPlayer.player_ign).filter_by(manager_id=manager_id).order_by(RosterPlayer.id))
+    aliases = tuple(PlayerAlias.query.with_entities(PlayerAlias.alias_key, PlayerAlias.canonical_ign).filter_by(manager_id=manager_id).order_by(PlayerAlias.alias_key))
+    return roster, tuple(tuple(row) for row in aliases)
+
+
+def get_roster_matcher(manager_id):
+    fingerprint = _roster_fingerprint(manager_id)
+    with _matchers_lock:
+        cached = _matchers.get(manager_id)
+        if cached and cached[0] == fingerprint: return cached[1]
+    matcher = RosterMatcher(*fingerprint)
+    with _matchers_lock:
+        _matchers[manager_id] = (fingerprint, matcher)
+    return matcher
+
+
+def invalidate_roster_matcher(manager_id):
+    with _matchers_lock:
+        _matchers.pop(manager_id, None)
@@ -0,0 +1,83 @@
+from flask import current_app
+from . import db
+from .models import MatchEvent, PerformanceRecord
+from .scoreboard_parser import parse_scoreboard
+from .ign_matcher import get_roster_matcher
+
+
+class IngestError(Exception):
+    """Raised when a scoreboard can't be turned into a match (maps to a 400)."""
+
+
+def save_match_from_annotations(texts, manager_id):
+    """Parses OCR annotations of a scoreboard and stores the match.
+    Returns (players saved, match id); raises IngestError if nothing usable was found."""
+    if not texts: raise IngestError('OCR could not read any text.')
+
+    parsed = parse_scoreboard(texts)
+    players = parsed['players']
+    new_match_event = MatchEvent(uploaded_by_id=manager_id, map_name=parsed['map_name'], team_rank=parsed['team_rank'])
+    db.session.add(new_match_event)
+
+    roster_matcher = get_roster_matcher(manager_id)
+
+    found_players_count = 0
+    saved_igns = set()
+    for player_data in players:
+        stats = player_data['stats']
+        if 'finishes' in stats:
+            ocr_ign = player_data['ign']
+            canonical_ign = roster_matcher.best_match(ocr_ign, cutoff=0.7)
+            if canonical_ign in saved_igns:
+                current_app.logger.warning('Skipping %s: %s already matched another row of this scoreboard', ocr_ign, canonical_ign)
+            elif canonical_ign:
+                survival_sec = 0.0
+                survival_str = stats.get('survived', '0m')
+                if 'm' in survival_str:
+                    try: survival_sec = float(survival_str.replace('m', '')) * 60
+                    except ValueError: pass
+                try:
+                    performance = PerformanceRecord(
+                        match_event=new_match_event, player_ign=canonical_ign,
+                        kills=int(float(stats.get('finishes', 0))),
+                        assists=int(float(stats.get('assists', 0))),
+                        damage=int(float(stats.get('damage', 0))),
+                        revives=int(float(stats.get('rescue', 0))),
+                        survival_time_sec=survival_sec,
+                        recall=int(float(stats.get('recall', 0))),
+                        rating=float(stats.get('rating', 0.0))
+                    )
+                    db.session.add(performance)
+                    saved_igns.add(canonical_ign)
+                    found_players_count += 1
+                except (ValueError, TypeError):
+                    current_app.logger.warning('Skipping potentially invalid stats for %s: %s', canonical_ign, stats)
+                    continue
+
+    if found_players_count == 0:
+        db.session.rollback()
+        raise IngestError('Could not parse or match any valid player stats.')
+
+    db.session.commit()
+    return found_players_count, new_match_event.id
+
+
+def manual_performance_values(p):
+    """Column values for a manually entered performance (raises ValueError/TypeError on bad input).
+    Shared by /add-manual-match and bulk import so both apply the same conversions."""
+    # --- Convert survival time M:S to seconds ---
+    survival_sec = 0.0
+    if 'survival_minutes' in p or 'survival_seconds' in p:
+        mins = int(p.get('survival_minutes', 0))
+        secs = int(p.get('survival_seconds', 0))
+        survival_sec = (mins * 60) + secs
+    return {
+        'player_ign': p.get('player_ign'),
+        'kills': int(p.get('kills', 0)),
+        'assists': int(p.get('assists', 0)),
+        'damage': int(p.get('damage', 0)),
+        'revives': int(p.get('revives', 0)),
+        'survival_time_sec': survival_sec,
+        'recall': int(p.get('recall', 0)),
+        'rating': float(p.get('rating', 0.0))
+    }
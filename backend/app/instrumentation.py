@@ -0,0 +1,211 @@
+import bisect
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import current_app, request, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# --- REQUEST INSTRUMENTATION (opt-in: METRICS_ENABLED=1) ---
+# Each api request records wall time, time spent in SQL, the number of statements and
+# time spent waiting on the OCR backend. The totals go out as a Server-Timing header
+# and into per-process Prometheus metrics served at /metrics. A request that runs more
+# than METRICS_QUERY_THRESHOLD statements is logged as a likely N+1 together with the
+# statement it repeated most. Wall time stops when the view returns, so streamed
+# bodies (/export) are not included.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class RequestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.queries = 0
+        self.ocr_time = 0.0
+        self.queue_time = 0.0
+        self.statements = Counter()
+
+
+_current = ContextVar('fda_request_stats', default=None)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # last slot is +Inf
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+
+class MetricsRegistry:
+    """Histograms and counters keyed by label tuples, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latency = {}   # (route, method) -> Histogram
+        self.ocr = Histogram()
+        self.requests = Counter() # (route, method, status)
+        self.queries = Counter()  # route
+        self.db_seconds = Counter()
+        self.n_plus_one = Counter()
+        self.gauges = [] # (name, help, read(), type) sampled at scrape time
+
+    def add_gauge(self, name, help, read, kind='gauge'):
+        self.gauges.append((name, help, read, kind))
+
+    def observe_request(self, route, method, status, stats, elapsed):
+        with self._lock:
+            histogram = self.latency.get((route, method))
+            if histogram is None: histogram = self.latency[(route, method)] = Histogram()
+            histogram.observe(elapsed)
+            self.requests[(route, method, str(status))] += 1
+            self.queries[route] += stats.queries
+            self.db_seconds[route] += stats.db_time
+
+    def observe_ocr(self, elapsed):
+        with self._lock: self.ocr.observe(elapsed)
+
+    def flag_n_plus_one(self, route):
+        with self._lock: self.n_plus_one[route] += 1
+
+    def render(self):
+        lines = []
+
+        def labels(**kw):
+            return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in kw.items()) + '}' if kw else ''
+
+        def histogram(name, h, **kw):
+            cumulative = 0
+            for bound, count in zip([str(b) for b in h.buckets] + ['+Inf'], h.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{labels(**kw, le=bound)} {cumulative}')
+            lines.append(f'{name}_sum{labels(**kw)} {h.total:.6f}')
+            lines.append(f'{name}_count{labels(**kw)} {cumulative}')
+
+        with self._lock:
+            lines += ['# HELP fda_request_duration_seconds Wall time of api requests.', '# TYPE fda_request_duration_seconds histogram']
+            for (route, method), h in sorted(self.latency.items()): histogram('fda_request_duration_seconds', h, route=route, method=method)
+            lines += ['# HELP fda_requests_total Api requests by status.', '# TYPE fda_requests_total counter']
+            lines += [f'fda_requests_total{labels(route=r, method=m, status=s)} {n}' for (r, m, s), n in sorted(self.requests.items())]
+            lines += ['# HELP fda_db_queries_total SQL statements run by api requests.', '# TYPE fda_db_queries_total counter']
+            lines += [f'fda_db_queries_total{labels(route=r)} {n}' for r, n in sorted(self.queries.items())]
+            lines += ['# HELP fda_db_seconds_total Time api requests spent in SQL.', '# TYPE fda_db_seconds_total counter']
+            lines += [f'fda_db_seconds_total{labels(route=r)} {n:.6f}' for r, n in sorted(self.db_seconds.items())]
+            lines += ['# HELP fda_n_plus_one_total Requests over the query-count threshold.', '# TYPE fda_n_plus_one_total counter']
+            lines += [f'fda_n_plus_one_total{labels(route=r)} {n}' for r, n in sorted(self.n_plus_one.items())]
+            lines += ['# HELP fda_ocr_duration_seconds Time spent in OCR backend calls, requests and upload jobs.', '# TYPE fda_ocr_duration_seconds histogram']
+            histogram('fda_ocr_duration_seconds', self.ocr)
+        for name, help, read, kind in self.gauges:
+            lines += [f'# HELP {name} {help}', f'# TYPE {name} {kind}', f'{name} {read()}']
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _registry():
+    return current_app.extensions.get('metrics')
+
+
+# --- SQL hooks: only count statements issued while a request is being measured ---
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None: context._fda_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = getattr(context, '_fda_started', None)
+    if stats is None or started is None: return
+    stats.db_time += time.perf_counter() - started
+    stats.queries += 1
+    stats.statements[statement] += 1
+
+
+_hooks_installed = False
+_hooks_lock = threading.Lock()
+
+
+def _install_sql_hooks():
+    global _hooks_installed
+    with _hooks_lock:
+        if _hooks_installed: return
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _hooks_installed = True
+
+
+def record_queue_wait(seconds):
+    """Time a request spent waiting for an OCR slot (see admission.py)."""
+    stats = _current.get()
+    if stats is not None: stats.queue_time += seconds
+
+
+@contextmanager
+def ocr_timer():
+    """Wrap OCR backend calls so they show up in Server-Timing and the OCR histogram."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        stats = _current.get()
+        if stats is not None: stats.ocr_time += elapsed
+        registry = _registry()
+        if registry is not None: registry.observe_ocr(elapsed)
+
+
+# --- request hooks ---
+
+def _start_request():
+    request._fda_stats_token = _current.set(RequestStats())
+
+
+def _finish_request(response):
+    stats = _current.get()
+    if stats is None: return response
+    elapsed = time.perf_counter() - stats.started
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+
+    timings = [f'app;dur={elapsed * 1000:.1f}', f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"']
+    if stats.queue_time: timings.append(f'ocr-queue;dur={stats.queue_time * 1000:.1f}')
+    if stats.ocr_time: timings.append(f'ocr;dur={stats.ocr_time * 1000:.1f}')
+    response.headers.add('Server-Timing', ', '.join(timings))
+
+    registry = _registry()
+    registry.observe_request(route, request.method, response.status_code, stats, elapsed)
+    threshold = current_app.config.get('METRICS_QUERY_THRESHOLD', 30)
+    if stats.queries > threshold:
+        registry.flag_n_plus_one(route)
+        statement, repeats = stats.statements.most_common(1)[0]
+        current_app.logger.warning('Possible N+1 on %s %s: %d queries (threshold %d); ran %dx: %s',
+                                   request.method, route, stats.queries, threshold, repeats, ' '.join(statement.split())[:300])
+    return response
+
+
+def _end_request(exc=None):
+    token = getattr(request, '_fda_stats_token', None)
+    if token is not None: _current.reset(token)
+
+
+def metrics_view():
+    return Response(_registry().render(), mimetype='text/plain; version=0.0.4')
+
+
+def init_instrumentation(app, blueprint_name='api'):
+    """Hooks the blueprint's requests and adds /metrics when METRICS_ENABLED is set; otherwise does nothing.
+    Hooks are registered on the app (scoped to the blueprint) so the shared blueprint object is never mutated."""
+    if not app.config.get('METRICS_ENABLED'): return
+    app.extensions['metrics'] = MetricsRegistry()
+    _install_sql_hooks()
+    app.before_request_funcs.setdefault(blueprint_name, []).append(_start_request)
+    app.after_request_funcs.setdefault(blueprint_name, []).append(_finish_request)
+    app.teardown_request_funcs.setdefault(blueprint_name, []).append(_end_request)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -0,0 +1,87 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from . import db
+from .models import UploadJob
+from .ocr import get_ocr_backend
+from .ingest import save_match_from_annotations, IngestError
+from .response_cache import bump_data_version
+from .instrumentation import ocr_timer
+
+# --- BACKGROUND OCR INGEST ---
+# Uploaded screenshots become UploadJob rows; OCR + parsing runs on a small shared
+# thread pool so the request returns as soon as the jobs are queued.
+
+_executor = None
+_executor_lock = threading.Lock()
+_queued = 0 # images submitted but not yet picked up by a worker
+
+
+def queued_images():
+    return _queued
+
+
+def _get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=app.config.get('OCR_WORKERS', 2), thread_name_prefix='ocr')
+        return _executor
+
+
+def enqueue_uploads(app, manager_id, files):
+    """files is a list of (filename, bytes). Returns the created UploadJob rows."""
+    jobs = [UploadJob(id=uuid.uuid4().hex, user_id=manager_id, filename=name, status='queued') for name, _ in files]
+    pending = [(job.id, content) for job, (_, content) in zip(jobs, files)]
+    db.session.add_all(jobs)
+    db.session.commit()
+
+    # Group images into batches so each OCR call annotates several screenshots at once
+    batch_size = max(1, app.config.get('OCR_BATCH_SIZE', 8))
+    global _queued
+    executor = _get_executor(app)
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        with _executor_lock: _queued += len(batch)
+        executor.submit(_run_batch, app, manager_id, batch)
+    return jobs
+
+
+def _set_status(job_id, status, message=None, match_id=None):
+    job = db.session.get(UploadJob, job_id)
+    if not job: return
+    job.status = status
+    job.message = message
+    if match_id is not None: job.match_id = match_id
+    if status in ('done', 'failed'): job.finished_at = datetime.utcnow()
+    db.session.commit()
+
+
+def _run_batch(app, manager_id, batch):
+    global _queued
+    with _executor_lock: _queued -= len(batch)
+    with app.app_context():
+        try:
+            for job_id, _ in batch:
+                _set_status(job_id, 'running')
+            with ocr_timer(): results = get_ocr_backend(app).detect_batch([content for _, content in batch])
+        except Exception as e:
+            db.session.rollback()
+            for job_id, _ in batch:
+                _set_status(job_id, 'failed', f'An error occurred: {str(e)}')
+            db.session.remove()
+            return
+
+        for (job_id, _), result in zip(batch, results):
+            try:
+                if result.error: raise Exception(result.error)
+                count, match_id = save_match_from_annotations(result.texts, manager_id)
+                _set_status(job_id, 'done', f'Successfully saved stats for {count} matched players.', match_id)
+                bump_data_version(manager_id)
+            except IngestError as e:
+                _set_status(job_id, 'failed', str(e))
+            except Exception as e:
+                db.session.rollback()
+                _set_status(job_id, 'failed', f'An error occurred: {str(e)}')
+        db.session.remove()
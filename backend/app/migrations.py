@@ -0,0 +1,133 @@
+import re
+from datetime import datetime
+from sqlalchemy import inspect, text
+from . import db
+
+# --- SCHEMA MIGRATIONS ---
+# `flask migrate` first creates any missing tables from the models (db.create_all),
+# then applies the ordered, numbered steps below for databases created before a
+# schema change. Applied versions are recorded in schema_migrations. Fresh tables
+# already have the latest schema, so every step checks what exists before altering.
+# Steps get the connection and `echo`, for telling the operator about any data they change.
+
+def _columns(conn, table):
+    return {c['name'] for c in inspect(conn).get_columns(table)}
+
+def _indexes(conn, table):
+    return {i['name'] for i in inspect(conn).get_indexes(table)}
+
+
+def add_player_ign_norm(conn, echo):
+    if 'player_ign_norm' not in _columns(conn, 'performance_record'):
+        conn.execute(text('ALTER TABLE performance_record ADD COLUMN player_ign_norm VARCHAR(80)'))
+    # Backfill per distinct IGN, normalizing in Python so keys match models.ign_key exactly
+    from .models import ign_key
+    igns = [row[0] for row in conn.execute(text('SELECT DISTINCT player_ign FROM performance_record WHERE player_ign_norm IS NULL AND player_ign IS NOT NULL'))]
+    for ign in igns:
+        conn.execute(text('UPDATE performance_record SET player_ign_norm = :norm WHERE player_ign = :ign'), {'norm': ign_key(ign), 'ign': ign})
+    if 'ix_performance_record_ign_norm_match' not in _indexes(conn, 'performance_record'):
+        conn.execute(text('CREATE INDEX ix_performance_record_ign_norm_match ON performance_record (player_ign_norm, match_id)'))
+
+
+def backfill_player_aggregates(conn, echo):
+    from .aggregates import rebuild_player_aggregates
+    if conn.execute(text('SELECT COUNT(*) FROM player_aggregate')).scalar() == 0:
+        rebuild_player_aggregates(connection=conn)
+
+
+def add_tip_codes(conn, echo):
+    # No backfill: records without codes get them the first time they're read
+    columns = _columns(conn, 'performance_record')
+    if 'tip_codes' not in columns:
+        conn.execute(text('ALTER TABLE performance_record ADD COLUMN tip_codes VARCHAR(160)'))
+    if 'tips_version' not in columns:
+        conn.execute(text('ALTER TABLE performance_record ADD COLUMN tips_version INTEGER'))
+
+
+def cascade_performance_match_fk(conn, echo):
+    fk = next((fk for fk in inspect(conn).get_foreign_keys('performance_record') if fk['referred_table'] == 'match_event'), None)
+    if fk and (fk.get('options') or {}).get('ondelete', '').upper() == 'CASCADE': return
+    if conn.dialect.name != 'sqlite':
+        if fk and fk.get('name'):
+            conn.execute(text(f'ALTER TABLE performance_record DROP CONSTRAINT {fk["name"]}'))
+        conn.execute(text('ALTER TABLE performance_record ADD CONSTRAINT performance_record_match_id_fkey '
+                          'FOREIGN KEY (match_id) REFERENCES match_event (id) ON DELETE CASCADE'))
+        return
+    # SQLite can't alter a constraint: rebuild the table from its own DDL with the clause added,
+    # then restore its indexes
+    table_sql = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'performance_record'")).scalar()
+    index_sql = [row[0] for row in conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'index' AND tbl_name = 'performance_record' AND sql IS NOT NULL"))]
+    reference = re.compile(r'(FOREIGN KEY\s*\(\s*"?match_id"?\s*\)\s*REFERENCES\s*"?match_event"?\s*\(\s*"?id"?\s*\))', re.IGNORECASE)
+    new_sql, found = reference.subn(r'\1 ON DELETE CASCADE', table_sql)
+    if not found: raise RuntimeError('performance_record.match_id foreign key not found in the table definition')
+    new_sql = re.sub(r'^CREATE TABLE\s+"?performance_record"?', 'CREATE TABLE performance_record_rebuild', new_sql)
+    columns = ', '.join(_columns(conn, 'performance_record'))
+    conn.execute(text(new_sql))
+    conn.execute(text(f'INSERT INTO performance_record_rebuild ({columns}) SELECT {columns} FROM performance_record'))
+    conn.execute(text('DROP TABLE performance_record'))
+    conn.execute(text('ALTER TABLE performance_record_rebuild RENAME TO performance_record'))
+    for sql in index_sql: conn.execute(text(sql))
+
+
+HOT_PATH_INDEXES = [
+    ('match_event', 'ix_match_event_uploaded_by_date', 'CREATE INDEX ix_match_event_uploaded_by_date ON match_event (uploaded_by_id, match_date)'),
+    ('performance_record', 'uq_performance_record_match_player', 'CREATE UNIQUE INDEX uq_performance_record_match_player ON performance_record (match_id, player_ign)'),
+    ('roster_player', 'uq_roster_player_manager_ign', 'CREATE UNIQUE INDEX uq_roster_player_manager_ign ON roster_player (manager_id, player_ign)'),
+]
+
+
+DUPLICATE_ROSTER = 'FROM roster_player WHERE id NOT IN (SELECT MIN(id) FROM roster_player GROUP BY manager_id, player_ign)'
+DUPLICATE_PERFORMANCES = ('FROM performance_record WHERE player_ign IS NOT NULL AND id NOT IN '
+                          '(SELECT MIN(id) FROM performance_record WHERE player_ign IS NOT NULL GROUP BY match_id, player_ign)')
+MAX_REPORTED_ROWS = 50
+
+
+def _report_removed(echo, what, rows, describe):
+    if not rows: return
+    echo(f'Removing {len(rows)} duplicate {what} (the oldest row of each group is kept):')
+    for row in rows[:MAX_REPORTED_ROWS]: echo('  ' + describe(row))
+    if len(rows) > MAX_REPORTED_ROWS: echo(f'  ... and {len(rows) - MAX_REPORTED_ROWS} more')
+
+
+def add_hot_path_indexes(conn, echo):
+    # The unique indexes can't be built over duplicates: keep the oldest row of each group and list the rest
+    roster = conn.execute(text(f'SELECT id, manager_id, player_ign {DUPLICATE_ROSTER} ORDER BY id')).all()
+    _report_removed(echo, 'roster_player rows', roster, lambda r: f'id {r[0]}: manager {r[1]}, player_ign {r[2]!r}')
+    if roster: conn.execute(text(f'DELETE {DUPLICATE_ROSTER}'))
+    performances = conn.execute(text(f'SELECT id, match_id, player_ign, kills, damage {DUPLICATE_PERFORMANCES} ORDER BY id')).all()
+    _report_removed(echo, 'performance_record rows', performances,
+                    lambda r: f'id {r[0]}: match {r[1]}, player_ign {r[2]!r} (kills {r[3]}, damage {r[4]})')
+    if performances:
+        conn.execute(text(f'DELETE {DUPLICATE_PERFORMANCES}'))
+        from .aggregates import rebuild_player_aggregates
+        rebuild_player_aggregates(connection=conn)
+    for table, name, sql in HOT_PATH_INDEXES:
+        if name not in _indexes(conn, table): conn.execute(text(sql))
+
+
+MIGRATIONS = [
+    (1, 'add performance_record.player_ign_norm', add_player_ign_norm),
+    (2, 'backfill player_aggregate', backfill_player_aggregates),
+    (3, 'add performance_record.tip_codes', add_tip_codes),
+    (4, 'performance_record.match_id ON DELETE CASCADE', cascade_performance_match_fk),
+    (5, 'indexes on match_event owner/date, unique performance and roster IGNs', add_hot_path_indexes),
+]
+
+
+def run_migrations(echo=print):
+    """Creates missing tables, then applies pending migrations, each in its own transaction.
+    Returns the versions applied."""
+    db.create_all()
+    with db.engine.begin() as conn:
+        conn.execute(text('CREATE TABLE IF NOT EXISTS schema_migrations (version INTEGER PRIMARY KEY, name VARCHAR(200), applied_at TIMESTAMP)'))
+        done = {row[0] for row in conn.execute(text('SELECT version FROM schema_migrations'))}
+    applied = []
+    for version, name, step in MIGRATIONS:
+        if version in done: continue
+        with db.engine.begin() as conn:
+            step(conn, echo)
+            conn.execute(text('INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :t)'),
+                         {'v': version, 'n': name, 't': datetime.utcnow()})
+        echo(f'Applied migration {version}: {name}')
+        applied.append(version)
+    return applied
@@ -1,5 +1,6 @@
 from . import db
 from flask_login import UserMixin
+from sqlalchemy.orm import validates
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 
@@ -19,17 +20,30 @@ class User(UserMixin, db.Model):
     def check_password(self, password): return self.password_hash and check_password_hash(self.password_hash, password)
 
 class MatchEvent(db.Model):
+    __table_args__ = (
+        db.Index('ix_match_event_uploaded_by_date', 'uploaded_by_id', 'match_date'), # every list filters by owner, newest first
+    )
     id = db.Column(db.Integer, primary_key=True)
     match_date = db.Column(db.DateTime, default=datetime.utcnow)
     map_name = db.Column(db.String(50))
     team_rank = db.Column(db.Integer)
     uploaded_by_id = db.Column(db.Integer, db.ForeignKey('user.id'))
-    performances = db.relationship('PerformanceRecord', backref='match_event', cascade="all, delete-orphan")
+    # passive_deletes: the database's ON DELETE CASCADE removes performances, so deleting a match doesn't load them
+    performances = db.relationship('PerformanceRecord', backref='match_event', cascade="all, delete-orphan", passive_deletes=True)
+
+def ign_key(ign):
+    """Case-insensitive lookup key for a player IGN (what `ilike` used to match on)."""
+    return (ign or '').lower()
 
 class PerformanceRecord(db.Model):
+    __table_args__ = (
+        db.Index('ix_performance_record_ign_norm_match', 'player_ign_norm', 'match_id'),
+        db.Index('uq_performance_record_match_player', 'match_id', 'player_ign', unique=True), # one row per player per match
+    )
     id = db.Column(db.Integer, primary_key=True)
-    match_id = db.Column(db.Integer, db.ForeignKey('match_event.id'))
+    match_id = db.Column(db.Integer, db.ForeignKey('match_event.id', ondelete='CASCADE'))
     player_ign = db.Column(db.String(80))
+    player_ign_norm = db.Column(db.String(80)) # ign_key(player_ign), kept in sync below; lets lookups use an index
     kills = db.Column(db.Integer)
     assists = db.Column(db.Integer)
     damage = db.Column(db.Integer)
@@ -38,8 +52,58 @@ class PerformanceRecord(db.Model):
     survival_time_sec = db.Column(db.Float, default=0.0) # Storing '19.3m' as a string
     recall = db.Column(db.Integer)
     rating = db.Column(db.Float)
+    # Recommendation tip codes ("CODE,CODE"), computed on write by app/tips.py
+    tip_codes = db.Column(db.String(160))
+    tips_version = db.Column(db.Integer) # THRESHOLDS_VERSION the codes were computed with
+
+    @validates('player_ign')
+    def _sync_ign_norm(self, key, value):
+        self.player_ign_norm = ign_key(value)
+        return value
 
 class RosterPlayer(db.Model):
+    __table_args__ = (
+        db.Index('uq_roster_player_manager_ign', 'manager_id', 'player_ign', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     player_ign = db.Column(db.String(80), nullable=False)
-    manager_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
\ No newline at end of file
+    manager_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+class PlayerAlias(db.Model):
+    # Alias -> canonical IGN per manager, checked before fuzzy roster matching (app/ign_aliases.py)
+    manager_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    alias_key = db.Column(db.String(80), primary_key=True) # ign_key(alias)
+    alias = db.Column(db.String(80), nullable=False)
+    canonical_ign = db.Column(db.String(80), nullable=False)
+
+class PlayerAggregate(db.Model):
+    # Running totals per (manager, player), kept in sync by app/aggregates.py
+    manager_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    player_ign_key = db.Column(db.String(80), primary_key=True) # ign_key(player_ign)
+    matches = db.Column(db.Integer, nullable=False, default=0)
+    wins = db.Column(db.Integer, nullable=False, default=0)
+    sum_kills = db.Column(db.BigInteger, nullable=False, default=0)
+    sum_assists = db.Column(db.BigInteger, nullable=False, default=0)
+    sum_damage = db.Column(db.BigInteger, nullable=False, default=0)
+    sum_revives = db.Column(db.BigInteger, nullable=False, default=0)
+    sum_recall = db.Column(db.BigInteger, nullable=False, default=0)
+    sum_survival_time_sec = db.Column(db.Float, nullable=False, default=0.0)
+    sum_rating = db.Column(db.Float, nullable=False, default=0.0)
+
+class UploadJob(db.Model):
+    id = db.Column(db.String(32), primary_key=True) # uuid4 hex
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    filename = db.Column(db.String(255))
+    status = db.Column(db.String(20), default='queued') # queued, running, done, failed
+    message = db.Column(db.String(255))
+    match_id = db.Column(db.Integer) # MatchEvent created by this job, if any
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id, 'filename': self.filename, 'status': self.status,
+            'message': self.message, 'match_id': self.match_id,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None,
+            'finished_at': self.finished_at.strftime('%Y-%m-%d %H:%M:%S') if self.finished_at else None
+        }
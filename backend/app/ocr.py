@@ -0,0 +1,413 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+# --- OCR BACKENDS ---
+# Every backend takes a list of raw image bytes and returns one OCRResult per image,
+# in the same order. `texts` is a list of TokenBox: texts[0] is the full text block,
+# the rest are single tokens. Vertices are (x, y) pixel corners, clockwise from top-left.
+# On disk (fixtures, recordings, the cache) a token is
+# {"description": "...", "vertices": [[x, y], [x, y], [x, y], [x, y]]}.
+
+TokenBox = namedtuple('TokenBox', ['description', 'vertices'])
+# degraded: produced by the overflow engine under load, so it isn't cached as the answer for that image
+OCRResult = namedtuple('OCRResult', ['texts', 'error', 'degraded'], defaults=[False])
+
+
+def _to_annotation(token):
+    return TokenBox(token['description'], [tuple(v) for v in token.get('vertices', [[0, 0]] * 4)])
+
+
+def _to_token(box):
+    return {'description': box.description, 'vertices': [list(v) for v in box.vertices]}
+
+
+def image_key(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+class VisionOCRBackend:
+    # Vision accepts up to 16 images per batch_annotate_images call
+    max_batch_size = 16
+
+    def __init__(self, key_path=None):
+        from google.cloud import vision
+        if key_path:
+            os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = key_path
+        self.vision = vision
+        self.client = vision.ImageAnnotatorClient()
+
+    def detect_batch(self, contents):
+        vision = self.vision
+        feature = vision.Feature(type_=vision.Feature.Type.TEXT_DETECTION)
+        results = []
+        for start in range(0, len(contents), self.max_batch_size):
+            chunk = contents[start:start + self.max_batch_size]
+            requests = [vision.AnnotateImageRequest(image=vision.Image(content=c), features=[feature]) for c in chunk]
+            response = self.client.batch_annotate_images(requests=requests)
+            for r in response.responses:
+                error = f'Google Vision Error: {r.error.message}' if r.error.message else None
+                texts = [TokenBox(a.description, [(v.x, v.y) for v in a.bounding_poly.vertices]) for a in r.text_annotations]
+                results.append(OCRResult(texts, error))
+        return results
+
+
+class TesseractOCRBackend:
+    """Local OCR engine: no network and no per-call cost, but slower and less accurate than
+    Vision. Needs the optional pytesseract package and the tesseract binary."""
+    max_batch_size = 1
+
+    def __init__(self, lang='eng'):
+        import pytesseract
+        from PIL import Image
+        self.pytesseract = pytesseract
+        self.Image = Image
+        self.lang = lang
+
+    def detect_batch(self, contents):
+        return [self._detect(content) for content in contents]
+
+    def _detect(self, content):
+        import io
+        try:
+            image = self.Image.open(io.BytesIO(content))
+            data = self.pytesseract.image_to_data(image, lang=self.lang, output_type=self.pytesseract.Output.DICT)
+        except Exception as e:
+            return OCRResult([], f'Tesseract Error: {e}')
+        tokens, lines = [], {}
+        for i, word in enumerate(data['text']):
+            word = word.strip()
+            if not word or float(data['conf'][i]) < 0: continue
+            x, y, w, h = data['left'][i], data['top'][i], data['width'][i], data['height'][i]
+            tokens.append(TokenBox(word, [(x, y), (x + w, y), (x + w, y + h), (x, y + h)]))
+            lines.setdefault((data['block_num'][i], data['par_num'][i], data['line_num'][i]), []).append(word)
+        # Like Vision, the first entry is the whole text block, one line per row
+        full_text = TokenBox('\n'.join(' '.join(words) for words in lines.values()), [(0, 0)] * 4)
+        return OCRResult([full_text] + tokens, None)
+
+
+class FakeOCRBackend:
+    """Local stand-in for Vision. Each "image" is a JSON document of tokens in the on-disk format."""
+    max_batch_size = 16
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def detect_batch(self, contents):
+        if self.latency:
+            time.sleep(self.latency)
+        results = []
+        for content in contents:
+            try:
+                tokens = json.loads(content)
+            except (ValueError, UnicodeDecodeError):
+                results.append(OCRResult([], 'Fake OCR Error: image is not a JSON annotation fixture'))
+                continue
+            results.append(OCRResult([_to_annotation(t) for t in tokens], None))
+        return results
+
+
+# --- RECORD / REPLAY ---
+# Recordings are <sha256 of image bytes>.json files in the on-disk token format, so a
+# directory recorded in production can be replayed offline, fed to the benchmarks
+# (--fixtures) or used as parser regression cases.
+
+def _write_tokens(path, texts):
+    tmp_path = f'{path}.{threading.get_ident()}.tmp'
+    with open(tmp_path, 'wb') as f: f.write(json.dumps([_to_token(t) for t in texts]).encode())
+    os.replace(tmp_path, path)
+    return os.path.getsize(path)
+
+
+class RecordingOCRBackend:
+    """Passes calls through to a backend and saves every successful response to disk."""
+
+    def __init__(self, backend, directory):
+        self.backend = backend
+        self.directory = directory
+        self.max_batch_size = backend.max_batch_size
+        os.makedirs(directory, exist_ok=True)
+
+    def detect_batch(self, contents):
+        results = self.backend.detect_batch(contents)
+        for content, result in zip(contents, results):
+            if not result.error and not result.degraded:
+                _write_tokens(os.path.join(self.directory, f'{image_key(content)}.json'), result.texts)
+        return results
+
+
+class ReplayOCRBackend:
+    """Answers from a recording directory only; images never recorded come back as errors."""
+    max_batch_size = 16
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def detect_batch(self, contents):
+        results = []
+        for content in contents:
+            key = image_key(content)
+            try:
+                with open(os.path.join(self.directory, f'{key}.json'), 'rb') as f: tokens = json.loads(f.read())
+            except (OSError, ValueError):
+                results.append(OCRResult([], f'Replay OCR Error: no recording for image {key}'))
+                continue
+            results.append(OCRResult([_to_annotation(t) for t in tokens], None))
+        return results
+
+
+# --- IMAGE PREPARATION ---
+# Phone screenshots arrive at 3-4 MB. Before OCR each image is cropped to the
+# scoreboard and downscaled so its longest side is at most max_dimension, then token
+# coordinates are mapped back to the original image so the parser's pixel constants
+# still apply. The crop is learned per screen size: after a full-image OCR, the
+# parser's header row and player rows give the table's right and bottom edges, which
+# are the same for every screenshot from that screen size. If a cropped image no
+# longer parses, the full image is sent and the region is dropped. Content Pillow
+# can't open (e.g. fake-backend JSON) is passed through untouched.
+
+MAX_SQUAD_ROWS = 4
+
+
+def scoreboard_region(parsed, width, height):
+    """(left, top, right, bottom) covering the match info, names and stat columns, or None."""
+    from .scoreboard_parser import COLUMN_TOLERANCE
+    if len(parsed['headers']) < 3 or not parsed['players']: return None
+    header_y = parsed['header_y']
+    row_height = (max(p['y'] for p in parsed['players']) - header_y) / len(parsed['players'])
+    right = min(width, int(max(parsed['headers'].values()) + COLUMN_TOLERANCE))
+    bottom = min(height, int(header_y + row_height * (MAX_SQUAD_ROWS + 0.5)))
+    return (0, 0, right, bottom) # match info sits above the table and names left of it
+
+
+class PreparedImageOCRBackend:
+    def __init__(self, backend, max_dimension=1600, crop=True, jpeg_quality=90):
+        from PIL import Image
+        self.Image = Image
+        self.backend = backend
+        self.max_dimension = max_dimension
+        self.crop = crop
+        self.jpeg_quality = jpeg_quality
+        self.max_batch_size = backend.max_batch_size
+        self.regions = {} # (width, height) -> crop box
+        self._lock = threading.Lock()
+
+    def _prepare(self, content, use_region=True):
+        """Returns (bytes to send, (scale, left, top), original size, crop box); size is None when passed through."""
+        import io
+        try:
+            image = self.Image.open(io.BytesIO(content))
+            image.load()
+        except Exception:
+            return content, (1.0, 0, 0), None, None
+        size = image.size
+        box = self.regions.get(size) if self.crop and use_region else None
+        if box: image = image.crop(box)
+        longest = max(image.size)
+        scale = min(1.0, self.max_dimension / longest) if self.max_dimension else 1.0
+        if box is None and scale == 1.0: return content, (1.0, 0, 0), size, None
+        if scale < 1.0:
+            image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), self.Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.convert('RGB').save(buffer, format='JPEG', quality=self.jpeg_quality)
+        if box is None and buffer.tell() >= len(content): return content, (1.0, 0, 0), size, None # already small (flat PNG)
+        return buffer.getvalue(), (scale, box[0] if box else 0, box[1] if box else 0), size, box
+
+    @staticmethod
+    def _restore(texts, transform):
+        scale, left, top = transform
+        if transform == (1.0, 0, 0): return texts
+        return [TokenBox(t.description, [(round(x / scale + left), round(y / scale + top)) for x, y in t.vertices]) for t in texts]
+
+    def detect_batch(self, contents):
+        from .scoreboard_parser import parse_scoreboard
+        prepared = [self._prepare(c) for c in contents]
+        raw = self.backend.detect_batch([p[0] for p in prepared])
+        results, retry = [], []
+        for i, ((_, transform, size, box), result) in enumerate(zip(prepared, raw)):
+            if not result.error: result = result._replace(texts=self._restore(result.texts, transform))
+            results.append(result)
+            if result.error or not self.crop or size is None: continue
+            parsed = parse_scoreboard(result.texts)
+            if box and not parsed['headers']:
+                with self._lock: self.regions.pop(size, None) # layout changed; relearn from a full image
+                retry.append(i)
+            elif not box:
+                region = scoreboard_region(parsed, *size)
+                if region and region != (0, 0) + size:
+                    with self._lock: self.regions[size] = region
+        if retry:
+            prepared = [self._prepare(contents[i], use_region=False) for i in retry]
+            for i, (_, transform, _, _), result in zip(retry, prepared, self.backend.detect_batch([p[0] for p in prepared])):
+                results[i] = result if result.error else result._replace(texts=self._restore(result.texts, transform))
+        return results
+
+
+# --- LOAD-BASED ROUTING ---
+
+class LoadRoutedOCRBackend:
+    """Sends work to `primary` unless the OCR queue is deep, then to `overflow` (e.g. the
+    local engine), so a backlog of uploads doesn't wait on a slow or rate-limited API.
+    Depth is images in flight here plus images still queued for upload jobs."""
+
+    def __init__(self, primary, overflow, max_depth, queued=lambda: 0):
+        self.primary = primary
+        self.overflow = overflow
+        self.max_depth = max_depth
+        self.queued = queued
+        self.max_batch_size = primary.max_batch_size
+        self.in_flight = 0
+        self.overflowed = 0
+        self._lock = threading.Lock()
+
+    def detect_batch(self, contents):
+        with self._lock:
+            use_overflow = self.in_flight + self.queued() >= self.max_depth
+            if use_overflow: self.overflowed += len(contents)
+            else: self.in_flight += len(contents)
+        if use_overflow:
+            return [result._replace(degraded=True) for result in self.overflow.detect_batch(contents)]
+        try:
+            return self.primary.detect_batch(contents)
+        finally:
+            with self._lock: self.in_flight -= len(contents)
+
+
+# --- OCR RESULT CACHE ---
+# Raw annotations are stored on disk as <sha256 of image bytes>.json, in the same
+# format the fake backend reads. Least recently used entries (by mtime) are evicted
+# once the directory grows past max_bytes.
+
+class OCRCache:
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(e.stat().st_size for e in os.scandir(directory) if e.name.endswith('.json'))
+        if self._size > self.max_bytes: self._evict()
+
+    key = staticmethod(image_key)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.json')
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f: tokens = json.loads(f.read())
+            os.utime(path) # mark as recently used
+        except (OSError, ValueError):
+            with self._lock: self.misses += 1
+            return None
+        with self._lock: self.hits += 1
+        return [_to_annotation(t) for t in tokens]
+
+    def put(self, key, texts):
+        size = _write_tokens(self._path(key), texts)
+        with self._lock:
+            self._size += size
+            if self._size > self.max_bytes: self._evict()
+
+    def _evict(self):
+        entries = sorted((e for e in os.scandir(self.directory) if e.name.endswith('.json')), key=lambda e: e.stat().st_mtime)
+        self._size = sum(e.stat().st_size for e in entries)
+        target = self.max_bytes * 0.9 # leave some headroom so we don't evict on every put
+        for entry in entries:
+            if self._size <= target: break
+            try:
+                size = entry.stat().st_size
+                os.remove(entry.path)
+            except OSError:
+                continue
+            self._size -= size
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': True, 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups * 100, 2) if lookups else 0,
+                'size_bytes': self._size, 'max_bytes': self.max_bytes
+            }
+
+
+class CachedOCRBackend:
+    """Wraps a backend so only images never seen before reach it."""
+
+    def __init__(self, backend, cache):
+        self.backend = backend
+        self.cache = cache
+        self.max_batch_size = backend.max_batch_size
+
+    def detect_batch(self, contents):
+        keys = [OCRCache.key(c) for c in contents]
+        results = [None] * len(contents)
+        missing = []
+        for i, key in enumerate(keys):
+            texts = self.cache.get(key)
+            if texts is not None: results[i] = OCRResult(texts, None)
+            else: missing.append(i)
+        if missing:
+            fresh = self.backend.detect_batch([contents[i] for i in missing])
+            for i, result in zip(missing, fresh):
+                results[i] = result
+                if not result.error and not result.degraded: self.cache.put(keys[i], result.texts) # never cache failures
+        return results
+
+
+# --- PROCESS-WIDE BACKEND ---
+# The Vision client holds a gRPC channel and credentials; build it once per process.
+# Layers, outermost first: cache -> recorder -> image preparation -> load router -> engine(s).
+
+_backend = None
+_backend_lock = threading.Lock()
+
+OCR_BACKENDS = ('vision', 'tesseract', 'fake', 'replay')
+
+
+def _create_backend(app, name):
+    if name == 'fake':
+        return FakeOCRBackend(latency=app.config.get('OCR_FAKE_LATENCY', 0.0))
+    if name == 'tesseract':
+        return TesseractOCRBackend(lang=app.config.get('OCR_TESSERACT_LANG', 'eng'))
+    if name == 'replay':
+        if not app.config.get('OCR_REPLAY_DIR'): raise ValueError('OCR_BACKEND=replay needs OCR_REPLAY_DIR')
+        return ReplayOCRBackend(app.config['OCR_REPLAY_DIR'])
+    if name != 'vision':
+        raise ValueError(f'Unknown OCR backend {name!r}; expected one of {", ".join(OCR_BACKENDS)}')
+    key_path = os.path.join(os.path.dirname(app.root_path), 'gcp_key.json')
+    return VisionOCRBackend(key_path=key_path)
+
+
+def get_ocr_backend(app):
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                backend = _create_backend(app, app.config.get('OCR_BACKEND', 'vision'))
+                if app.config.get('OCR_OVERFLOW_BACKEND'):
+                    from .jobs import queued_images
+                    overflow = _create_backend(app, app.config['OCR_OVERFLOW_BACKEND'])
+                    backend = LoadRoutedOCRBackend(backend, overflow, app.config.get('OCR_OVERFLOW_DEPTH', 16), queued_images)
+                if app.config.get('OCR_MAX_DIMENSION') or app.config.get('OCR_CROP'):
+                    backend = PreparedImageOCRBackend(backend, app.config.get('OCR_MAX_DIMENSION', 0), app.config.get('OCR_CROP', False),
+                                                      app.config.get('OCR_JPEG_QUALITY', 90))
+                if app.config.get('OCR_RECORD_DIR'):
+                    backend = RecordingOCRBackend(backend, app.config['OCR_RECORD_DIR'])
+                if app.config.get('OCR_CACHE_MAX_BYTES', 0) > 0:
+                    backend = CachedOCRBackend(backend, OCRCache(app.config['OCR_CACHE_DIR'], app.config['OCR_CACHE_MAX_BYTES']))
+                _backend = backend
+    return _backend
+
+
+def get_ocr_cache_stats():
+    cache = getattr(_backend, 'cache', None)
+    return cache.stats() if cache else {'enabled': False}
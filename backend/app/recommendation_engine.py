@@ -1,4 +1,5 @@
 import random
+import numpy as np
 
 # --- Thresholds for Analysis ---
 # Single Match
@@ -19,6 +20,9 @@ THRESHOLDS = {
     'avg_good_winrate': 15.0,
     'avg_poor_winrate': 5.0,
 }
+# Bump whenever THRESHOLDS or the rules in match_tip_codes change; stored tip codes
+# with an older version are recomputed the next time they are read.
+THRESHOLDS_VERSION = 1
 # --- Recommendation Phrasing Lists (for variety) ---
 TIPS = {
     'HIGH_DMG_LOW_KILLS': [
@@ -54,63 +58,105 @@ TIPS = {
     ]
 }
 
-def generate_recommendations(stats, is_overall=False):
+# Fixed phrasings for codes that don't pick from TIPS
+FIXED_TIPS = {
+    'WINNER': "🍗 Winner Winner Chicken Dinner! A perfect all-around match.",
+    'HIGH_RATING': "⭐ A {rating} rating is outstanding. You dominated this match.",
+    'SOLID': "📊 A solid, consistent performance. Keep reviewing your gameplay for small optimizations.",
+}
+
+MAX_TIPS = 3
+
+def _column(values, default):
+    # Accepts NumPy arrays, lists or scalars; missing (None) stats fall back to the default
+    if isinstance(values, np.ndarray): return values.astype(float)
+    if np.isscalar(values) or values is None: values = [values]
+    return np.array([default if v is None else v for v in values], dtype=float)
+
+def _columns(pairs, n=None):
+    """[(values, default)] -> equal-length float arrays. Scalars and missing columns are repeated
+    to the batch length (n, or the array columns' length); differing lengths raise ValueError."""
+    lengths = {np.size(values) for values, _ in pairs if np.ndim(values) > 0} | ({n} if n is not None else set())
+    if len(lengths) > 1: raise ValueError(f'Columns have different lengths: {sorted(lengths)}')
+    n = lengths.pop() if lengths else 1
+    return [_column(values, default) if np.ndim(values) > 0 else np.full(n, default if values is None else values, dtype=float)
+            for values, default in pairs]
+
+def match_tip_codes(kills, damage, assists, revives, team_rank, rating, survival_time_sec, thresholds=None):
+    """Evaluates every per-match rule over whole columns at once.
+    Returns one list of tip codes per row, ordered combat, survival, teamplay, rating."""
+    t = thresholds or THRESHOLDS
+    kills, damage, assists, revives, rank, rating, survival_sec = _columns([
+        (kills, 0), (damage, 0), (assists, 0), (revives, 0), (team_rank, 99), (rating, 0), (survival_time_sec, 0)])
+
+    # Combat
+    high_damage = damage >= t['high_damage']
+    combat = np.select(
+        [high_damage & (kills >= t['high_kills']),
+         high_damage & (kills < t['low_kills']),
+         (damage <= t['low_damage']) & (kills <= t['low_kills']) & (survival_sec < t['short_survival_sec'])],
+        ['AGGRESSIVE_SUCCESS', 'HIGH_DMG_LOW_KILLS', 'LOW_COMBAT_IMPACT'], default='')
+    # Survival
+    won = rank == 1
+    survival = np.select(
+        [won & (kills < t['low_kills']), won, rank >= t['poor_rank']],
+        ['PASSIVE_WIN', 'WINNER', 'POOR_PLACEMENT'], default='')
+    # Teamplay
+    teamplay = np.select(
+        [(revives >= t['high_revives']) | (assists >= t['high_assists']),
+         (revives == 0) & (assists < 1) & (rank > t['good_rank'])],
+        ['GOOD_SUPPORT', 'LOW_SUPPORT'], default='')
+    # Rating
+    rated = np.where(rating >= t['high_rating'], 'HIGH_RATING', '')
+
+    return [[code for code in row if code] or ['SOLID'] for row in zip(combat.tolist(), survival.tolist(), teamplay.tolist(), rated.tolist())]
+
+def render_tips(codes, rating=0, rng=None):
+    """Turns tip codes into text. Pass a seeded random.Random for repeatable phrasing."""
+    rng = rng or random
+    recs = []
+    for code in codes[:MAX_TIPS]:
+        if code in TIPS: recs.append(rng.choice(TIPS[code]))
+        else: recs.append(FIXED_TIPS[code].format(rating=rating))
+    return recs
+
+def generate_recommendations_batch(columns, seed=None):
+    """Batch API: columns is a dict of equal-length arrays keyed like the stats dict
+    (kills, damage, assists, revives, team_rank, rating, survival_time_sec).
+    Returns (codes per row, tips per row); the same seed always gives the same tips."""
+    codes = match_tip_codes(
+        columns.get('kills', 0), columns.get('damage', 0), columns.get('assists', 0), columns.get('revives', 0),
+        columns.get('team_rank', 99), columns.get('rating', 0), columns.get('survival_time_sec', 0))
+    rng = random.Random(seed)
+    ratings, = _columns([(columns.get('rating', 0), 0)], n=len(codes))
+    tips = [render_tips(row, ratings[i].item(), rng) for i, row in enumerate(codes)]
+    return codes, tips
+
+def generate_recommendations(stats, is_overall=False, seed=None):
     recs = []
     t = THRESHOLDS # Alias for easier access
 
     # --- PER-MATCH ANALYSIS ---
     if not is_overall:
-        kills = stats.get('kills', 0)
-        damage = stats.get('damage', 0)
-        assists = stats.get('assists', 0)
-        revives = stats.get('revives', 0)
-        rank = stats.get('team_rank', 99)
-        rating = stats.get('rating', 0)
-        survival_sec = stats.get('survival_time_sec', 0)
-
-        # Combat
-        if damage >= t['high_damage'] and kills >= t['high_kills']:
-            recs.append(random.choice(TIPS['AGGRESSIVE_SUCCESS']))
-        elif damage >= t['high_damage'] and kills < t['low_kills']:
-            recs.append(random.choice(TIPS['HIGH_DMG_LOW_KILLS']))
-        elif damage <= t['low_damage'] and kills <= t['low_kills'] and survival_sec < t['short_survival_sec']:
-            recs.append(random.choice(TIPS['LOW_COMBAT_IMPACT']))
-        
-        # Survival
-        if rank == 1:
-            if kills < t['low_kills']:
-                recs.append(random.choice(TIPS['PASSIVE_WIN']))
-            else:
-                recs.append("🍗 Winner Winner Chicken Dinner! A perfect all-around match.")
-        elif rank >= t['poor_rank']:
-            recs.append(random.choice(TIPS['POOR_PLACEMENT']))
-        
-        # Teamplay
-        if revives >= t['high_revives'] or assists >= t['high_assists']:
-            recs.append(random.choice(TIPS['GOOD_SUPPORT']))
-        elif revives == 0 and assists < 1 and rank > t['good_rank']:
-            recs.append(random.choice(TIPS['LOW_SUPPORT']))
-            
-        # Rating
-        if rating >= t['high_rating']:
-            recs.append(f"⭐ A {rating} rating is outstanding. You dominated this match.")
+        columns = {key: [stats[key]] for key in ('kills', 'damage', 'assists', 'revives', 'team_rank', 'rating', 'survival_time_sec') if key in stats}
+        _, tips = generate_recommendations_batch(columns, seed=seed)
+        return tips[0]
 
     # --- OVERALL DASHBOARD ANALYSIS ---
-    else:
-        avg_kills = stats.get('avg_kills', 0)
-        win_rate = stats.get('win_rate', 0)
-        
-        if avg_kills >= t['avg_high_kills']:
-            recs.append(f"📈 Your average of {avg_kills} kills is excellent. You are a consistent fragger.")
-        elif avg_kills <= t['avg_low_kills']:
-            recs.append(f"📊 Your average of {avg_kills} kills is low. Focus on improving aim and advantageous fights.")
+    avg_kills = stats.get('avg_kills', 0)
+    win_rate = stats.get('win_rate', 0)
+
+    if avg_kills >= t['avg_high_kills']:
+        recs.append(f"📈 Your average of {avg_kills} kills is excellent. You are a consistent fragger.")
+    elif avg_kills <= t['avg_low_kills']:
+        recs.append(f"📊 Your average of {avg_kills} kills is low. Focus on improving aim and advantageous fights.")
 
-        if win_rate >= t['avg_good_winrate']:
-            recs.append(f"🏆 A {win_rate}% win rate is exceptional. Your strategies are clearly working.")
-        elif win_rate <= t['avg_poor_winrate']:
-             recs.append(f"📉 A {win_rate}% win rate is low. Focus on late-game rotations and placement.")
+    if win_rate >= t['avg_good_winrate']:
+        recs.append(f"🏆 A {win_rate}% win rate is exceptional. Your strategies are clearly working.")
+    elif win_rate <= t['avg_poor_winrate']:
+         recs.append(f"📉 A {win_rate}% win rate is low. Focus on late-game rotations and placement.")
 
     if not recs:
-        recs.append("📊 A solid, consistent performance. Keep reviewing your gameplay for small optimizations.")
+        recs.append(FIXED_TIPS['SOLID'])
         
-    return list(set(recs))[:3] # Return up to 3 unique recommendations
\ No newline at end of file
+    return list(set(recs))[:MAX_TIPS] # Return up to 3 unique recommendations
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request, make_response
+from flask_login import current_user
+
+# --- PER-USER RESPONSE CACHE ---
+# Read endpoints are cached per (user, data version, endpoint, args). Each user has a
+# data version that every successful write bumps, which makes all of their cached
+# entries unreachable at once (they then age out of the LRU). Responses carry a strong
+# ETag so clients revalidating with If-None-Match get an empty 304; the comparison is
+# weak, as If-None-Match requires, so compressed variants (W/"...") revalidate too.
+# Versions live in the backend, so only a shared backend (Redis) sees every worker's
+# writes; the local LRU is for single-process deployments and tests.
+
+class LocalCacheBackend:
+    """In-process LRU with per-entry TTL. Also the stand-in for a shared backend in tests.
+    Counters (incr) are kept apart and never evicted: a version that restarted from 0
+    could match the key of an older entry still in the LRU."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._counters: return self._counters[key]
+            entry = self._data.get(key)
+            if entry is None: return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl if ttl else None)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries: self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self._counters.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+
+class RedisCacheBackend:
+    """Shared backend so every worker process sees the same entries and versions."""
+
+    def __init__(self, url):
+        import redis # optional dependency, only needed when RESPONSE_CACHE_URL is set
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self.client.get(key)
+        return None if value is None else _loads(value)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, _dumps(value), ex=ttl)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def incr(self, key):
+        return self.client.incr(key)
+
+
+def _dumps(value):
+    if isinstance(value, int): return str(value).encode()
+    if isinstance(value, dict): return json.dumps(value).encode() # session users
+    body, etag, status = value
+    return etag.encode() + b'\n' + str(status).encode() + b'\n' + body
+
+def _loads(raw):
+    if raw.startswith(b'{'): return json.loads(raw)
+    if b'\n' not in raw: return int(raw)
+    etag, status, body = raw.split(b'\n', 2)
+    return body, etag.decode(), int(status)
+
+
+def init_response_cache(app):
+    if not app.config.get('RESPONSE_CACHE_ENABLED'):
+        backend = None
+    elif app.config.get('RESPONSE_CACHE_URL'):
+        backend = RedisCacheBackend(app.config['RESPONSE_CACHE_URL'])
+    else:
+        backend = LocalCacheBackend(app.config.get('RESPONSE_CACHE_SIZE', 1024))
+    app.extensions['response_cache'] = backend
+
+
+def _backend():
+    return current_app.extensions.get('response_cache')
+
+
+def _version_key(user_id):
+    return f'fda:v:{user_id}'
+
+
+def get_data_version(user_id):
+    backend = _backend()
+    return (backend.get(_version_key(user_id)) or 0) if backend else 0
+
+
+def bump_data_version(user_id):
+    """Invalidates every cached response of this user. Call after any write to their data."""
+    backend = _backend()
+    if backend: backend.incr(_version_key(user_id))
+
+
+def invalidate_on_write(response):
+    """after_request hook: successful writes by a logged-in user bump their data version."""
+    if request.method in ('POST', 'PUT', 'PATCH', 'DELETE') and response.status_code < 400 and current_user.is_authenticated:
+        bump_data_version(current_user.id)
+    return response
+
+
+def _etag_for(body):
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+def _not_modified(etag):
+    response = make_response('', 304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def cached_response(view):
+    """Caches a JSON GET view per user. Must sit below @login_required."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        backend = _backend()
+        if backend is None or request.method != 'GET':
+            return view(*args, **kwargs)
+
+        args_key = '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))
+        key = f'fda:r:{current_user.id}:{get_data_version(current_user.id)}:{request.endpoint}:{sorted(kwargs.items())}:{args_key}'
+        cached = backend.get(key)
+        if cached is not None:
+            body, etag, status = cached
+            if request.if_none_match.contains_weak(etag): return _not_modified(etag)
+            response = make_response(body, status)
+            response.mimetype = 'application/json'
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.direct_passthrough: return response
+            body = response.get_data()
+            etag = _etag_for(body)
+            backend.set(key, (body, etag, response.status_code), current_app.config.get('RESPONSE_CACHE_TTL', 300))
+            if request.if_none_match.contains_weak(etag): return _not_modified(etag)
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache' # always revalidate, never share
+        return response
+    return wrapper
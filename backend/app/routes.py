@@ -1,16 +1,33 @@
-from flask import Blueprint, request, jsonify, url_for, redirect, current_app
+from flask import Blueprint, request, jsonify, url_for, redirect, current_app, Response, stream_with_context
 from flask_login import login_user, logout_user, login_required, current_user
-from sqlalchemy import func
-from . import db, oauth
-from .models import User, MatchEvent, PerformanceRecord, RosterPlayer
+from sqlalchemy import or_, and_
+from sqlalchemy.orm import selectinload, contains_eager
+from . import db, get_oauth
+from .models import User, MatchEvent, PerformanceRecord, RosterPlayer, UploadJob, PlayerAggregate, PlayerAlias, ign_key
 import os
-import re
+import base64
+import binascii
+from datetime import datetime, timedelta
 from werkzeug.utils import secure_filename
-from google.cloud import vision
-from difflib import get_close_matches
-from .recommendation_engine import generate_recommendations
+from .recommendation_engine import THRESHOLDS_VERSION
+from .ocr import get_ocr_backend, get_ocr_cache_stats
+from .ingest import save_match_from_annotations, manual_performance_values, IngestError
+from .jobs import enqueue_uploads
+from .ign_matcher import get_roster_matcher, invalidate_roster_matcher
+from .aggregates import STAT_FIELDS
+from .response_cache import cached_response, invalidate_on_write
+from .session_users import invalidate_session_user
+from .instrumentation import ocr_timer
+from .admission import ocr_admission, admission_stats, AdmissionRejected
+from .export import export_query, EXPORT_FORMATS, STREAMERS, parquet_available
+from .bulk_import import import_matches
+from .tips import refresh_tip_codes, recommendations_for
+from .bulk_delete import delete_matches, MAX_DELETE_IDS
+from .ign_aliases import save_aliases, merge_players, MAX_MERGE_SOURCES
+from .compact import wants_columnar, compact_response, negotiate_encoding
 
 api = Blueprint('api', __name__)
+api.after_request(invalidate_on_write) # any successful write drops the user's cached reads
 
 # --- AUTH & OAUTH ROUTES ---
 
@@ -48,11 +65,11 @@ def login():
 @api.route('/google/login')
 def google_login():
     redirect_uri = url_for('api.google_callback', _external=True)
-    return oauth.google.authorize_redirect(redirect_uri)
+    return get_oauth().google.authorize_redirect(redirect_uri)
 
 @api.route('/google/callback')
 def google_callback():
-    token = oauth.google.authorize_access_token()
+    token = get_oauth().google.authorize_access_token()
     user_info = token.get('userinfo')
     if user_info:
         user = User.query.filter_by(email=user_info['email']).first()
@@ -81,38 +98,43 @@ def status():
 @api.route('/logout', methods=['POST'])
 @login_required
 def logout():
+    invalidate_session_user(current_user.id)
     logout_user()
     return jsonify({'message': 'Logged out successfully!'}), 200
 
 @api.route('/profile')
 @login_required
 def get_profile():
+    user = db.session.get(User, current_user.id) # not the cached snapshot, which can lag another worker's update
     return jsonify({
-        'username': current_user.username, 'email': current_user.email,
-        'first_name': current_user.first_name, 'last_name': current_user.last_name,
-        'bgmi_username': current_user.bgmi_username, 'bio': current_user.bio,
-        'country': current_user.country, 'instagram_url': current_user.instagram_url,
-        'youtube_url': current_user.youtube_url
+        'username': user.username, 'email': user.email,
+        'first_name': user.first_name, 'last_name': user.last_name,
+        'bgmi_username': user.bgmi_username, 'bio': user.bio,
+        'country': user.country, 'instagram_url': user.instagram_url,
+        'youtube_url': user.youtube_url
     }), 200
 
 @api.route('/profile', methods=['PUT'])
 @login_required
 def update_profile():
     data = request.get_json()
-    if 'username' in data and data['username'] != current_user.username and User.query.filter_by(username=data['username']).first():
+    user = db.session.get(User, current_user.id) # current_user is a cached snapshot, not the model
+    if 'username' in data and data['username'] != user.username and User.query.filter_by(username=data['username']).first():
         return jsonify({'message': 'Username already exists'}), 409
-    if 'bgmi_username' in data and data['bgmi_username'] != current_user.bgmi_username and User.query.filter_by(bgmi_username=data['bgmi_username']).first():
+    if 'bgmi_username' in data and data['bgmi_username'] != user.bgmi_username and User.query.filter_by(bgmi_username=data['bgmi_username']).first():
         return jsonify({'message': 'BGMI Username is already linked.'}), 409
     for field in ['username', 'first_name', 'last_name', 'bgmi_username', 'bio', 'country', 'instagram_url', 'youtube_url']:
         if field in data:
-            setattr(current_user, field, data[field])
+            setattr(user, field, data[field])
     db.session.commit()
+    invalidate_session_user(user.id)
     return jsonify({'message': 'Profile updated successfully'}), 200
 
 # --- TEAM ROSTER & PLAYER ROUTES ---
 
 @api.route('/players')
 @login_required
+@cached_response
 def get_all_players():
     # Fetch from the Roster table now
     player_records = db.session.query(RosterPlayer.player_ign).filter(RosterPlayer.manager_id == current_user.id).distinct().all()
@@ -121,6 +143,7 @@ def get_all_players():
 
 @api.route('/team', methods=['GET'])
 @login_required
+@cached_response
 def get_team():
     roster_players = RosterPlayer.query.filter_by(manager_id=current_user.id).all()
     players = [p.player_ign for p in roster_players]
@@ -138,6 +161,7 @@ def add_to_team():
     new_player = RosterPlayer(manager_id=current_user.id, player_ign=player_ign)
     db.session.add(new_player)
     db.session.commit()
+    invalidate_roster_matcher(current_user.id)
     return jsonify({'message': f'{player_ign} added to the roster.'}), 201
 
 @api.route('/team/remove', methods=['POST'])
@@ -148,8 +172,60 @@ def remove_from_team():
     player_ign = data['player_ign']
     RosterPlayer.query.filter_by(manager_id=current_user.id, player_ign=player_ign).delete()
     db.session.commit()
+    invalidate_roster_matcher(current_user.id)
     return jsonify({'message': f'{player_ign} has been removed from the roster.'}), 200
 
+@api.route('/players/aliases')
+@login_required
+@cached_response
+def get_player_aliases():
+    aliases = PlayerAlias.query.filter_by(manager_id=current_user.id).order_by(PlayerAlias.canonical_ign, PlayerAlias.alias_key).all()
+    return jsonify([{'alias': a.alias, 'canonical_ign': a.canonical_ign} for a in aliases])
+
+@api.route('/players/aliases/add', methods=['POST'])
+@login_required
+def add_player_alias():
+    """Maps `alias` to `canonical_ign` for future uploads and manual entries; existing records are untouched (see /players/merge)."""
+    data = request.get_json(silent=True) or {}
+    alias, canonical_ign = (data.get('alias') or '').strip(), (data.get('canonical_ign') or '').strip()
+    if not alias or not canonical_ign: return jsonify({'message': 'alias and canonical_ign are required.'}), 400
+    if ign_key(alias) == ign_key(canonical_ign): return jsonify({'message': 'An alias must differ from its canonical IGN.'}), 400
+    save_aliases(current_user.id, [alias], canonical_ign)
+    db.session.commit()
+    invalidate_roster_matcher(current_user.id)
+    return jsonify({'message': f'{alias} now maps to {canonical_ign}.'}), 201
+
+@api.route('/players/aliases/remove', methods=['POST'])
+@login_required
+def remove_player_alias():
+    data = request.get_json(silent=True) or {}
+    if not data.get('alias'): return jsonify({'message': 'alias is required.'}), 400
+    removed = PlayerAlias.query.filter_by(manager_id=current_user.id, alias_key=ign_key(data['alias'].strip())).delete()
+    db.session.commit()
+    invalidate_roster_matcher(current_user.id)
+    if not removed: return jsonify({'message': 'Alias not found.'}), 404
+    return jsonify({'message': f'Alias {data["alias"]} removed.'}), 200
+
+@api.route('/players/merge', methods=['POST'])
+@login_required
+def merge_player_igns():
+    """Renames every performance and roster entry of the `from` IGN(s) to `into` in one transaction and
+    saves them as aliases. Matching is case-insensitive. Returns the affected row counts."""
+    data = request.get_json(silent=True) or {}
+    sources = data.get('from')
+    if isinstance(sources, str): sources = [sources]
+    into = data.get('into').strip() if isinstance(data.get('into'), str) else ''
+    if not into or not isinstance(sources, list) or not sources or not all(isinstance(s, str) and s.strip() for s in sources):
+        return jsonify({'message': "Provide 'from' (an IGN or list of IGNs) and 'into'."}), 400
+    if len(sources) > MAX_MERGE_SOURCES:
+        return jsonify({'message': f'At most {MAX_MERGE_SOURCES} IGNs per merge.'}), 400
+    try:
+        result = merge_players(current_user.id, [s.strip() for s in sources], into)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'An error occurred: {str(e)}'}), 500
+    return jsonify(result), 200
+
 # --- MATCH DATA & OCR ROUTES ---
 
 # Add this PUT route inside the MATCH DATA & OCR ROUTES section
@@ -176,10 +252,66 @@ def update_match_event(event_id):
     db.session.commit()
     return jsonify({'message': 'Match info updated successfully.'}), 200
 
+def _encode_match_cursor(event):
+    raw = f"{event.match_date.isoformat()}|{event.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def _decode_match_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    match_date, event_id = raw.split('|')
+    return datetime.fromisoformat(match_date), int(event_id)
+
+def _parse_date_arg(name):
+    value = request.args.get(name)
+    return datetime.strptime(value, '%Y-%m-%d') if value else None
+
 @api.route('/matches')
 @login_required
+@negotiate_encoding
+@cached_response
 def get_matches():
-    events = MatchEvent.query.filter_by(uploaded_by_id=current_user.id).order_by(MatchEvent.match_date.desc()).all()
+    """Match history, newest first. Without `limit`/`cursor` the full list is returned (legacy shape);
+    with them, a page {'matches': [...], 'next_cursor': ...} keyed on (match_date, id).
+    `format=columnar` returns parallel arrays instead: ids, dates, map_names, ranks, and performances
+    as flat columns where match i owns entries offsets[i]:offsets[i + 1] (plus next_cursor when paging)."""
+    paginated = 'limit' in request.args or 'cursor' in request.args
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), 200)
+        date_from = _parse_date_arg('date_from')
+        date_to = _parse_date_arg('date_to')
+        cursor = _decode_match_cursor(request.args['cursor']) if request.args.get('cursor') else None
+    except (ValueError, TypeError, binascii.Error):
+        return jsonify({'message': 'Invalid limit, cursor or date (use YYYY-MM-DD).'}), 400
+
+    query = MatchEvent.query.options(selectinload(MatchEvent.performances)).filter_by(uploaded_by_id=current_user.id)
+    if request.args.get('map_name'): query = query.filter(MatchEvent.map_name == request.args['map_name'])
+    if date_from: query = query.filter(MatchEvent.match_date >= date_from)
+    if date_to: query = query.filter(MatchEvent.match_date < date_to + timedelta(days=1)) # inclusive end day
+    if cursor:
+        cursor_date, cursor_id = cursor
+        query = query.filter(or_(MatchEvent.match_date < cursor_date, and_(MatchEvent.match_date == cursor_date, MatchEvent.id < cursor_id)))
+    query = query.order_by(MatchEvent.match_date.desc(), MatchEvent.id.desc())
+
+    events = query.limit(limit + 1).all() if paginated else query.all()
+    has_more = paginated and len(events) > limit
+    events = events[:limit] if paginated else events
+    next_cursor = _encode_match_cursor(events[-1]) if has_more else None
+
+    if wants_columnar():
+        performances = [p for event in events for p in event.performances]
+        offsets = [0]
+        for event in events: offsets.append(offsets[-1] + len(event.performances))
+        payload = {
+            'format': 'columnar', 'ids': [e.id for e in events], 'dates': [e.match_date.strftime('%Y-%m-%d') for e in events],
+            'map_names': [e.map_name for e in events], 'ranks': [e.team_rank for e in events],
+            'performances': {
+                'offsets': offsets, 'ids': [p.id for p in performances], 'player_igns': [p.player_ign for p in performances],
+                'kills': [p.kills for p in performances], 'damage': [p.damage for p in performances],
+            },
+        }
+        if paginated: payload['next_cursor'] = next_cursor
+        return compact_response(payload)
+
     events_list = []
     for event in events:
         # --- THIS IS THE CHANGE ---
@@ -189,31 +321,43 @@ def get_matches():
             'id': event.id, 'match_date': event.match_date.strftime('%Y-%m-%d'),
             'map_name': event.map_name, 'team_rank': event.team_rank, 'performances': performances
         })
-    return jsonify(events_list)
+    if not paginated: return jsonify(events_list)
+    return jsonify({'matches': events_list, 'next_cursor': next_cursor})
 
 @api.route('/matches/<int:event_id>', methods=['GET'])
 @login_required
+@negotiate_encoding
+@cached_response
 def get_single_match_event(event_id):
+    """One match with full stats and tips per performance; `format=columnar` returns the performances as column arrays."""
     match_event = MatchEvent.query.get(event_id)
     if not match_event or match_event.uploaded_by_id != current_user.id:
         return jsonify({'message': 'Match not found or unauthorized'}), 404
     
+    # Tip codes are stored on write; only rows computed with older thresholds are redone here
+    records = match_event.performances
+    stale = [p for p in records if p.tips_version != THRESHOLDS_VERSION]
+    if stale:
+        refresh_tip_codes(stale, lambda p: match_event.team_rank)
+        db.session.commit()
+
+    if wants_columnar():
+        columns = {'ids': 'id', 'player_igns': 'player_ign', 'kills': 'kills', 'assists': 'assists', 'damage': 'damage',
+                   'revives': 'revives', 'survival_time_sec': 'survival_time_sec', 'recall': 'recall', 'rating': 'rating'}
+        performances = {name: [getattr(p, attr) for p in records] for name, attr in columns.items()}
+        performances['recommendations'] = [recommendations_for(p) for p in records]
+        return compact_response({
+            'format': 'columnar', 'id': match_event.id, 'match_date': match_event.match_date.strftime('%Y-%m-%d %H:%M'),
+            'map_name': match_event.map_name, 'team_rank': match_event.team_rank, 'performances': performances
+        })
+
     performances = []
-    for p in match_event.performances:
-        # Create stats dict for the recommendation engine
-        stats_dict = {
-            'kills': p.kills, 'assists': p.assists, 'damage': p.damage, 
-            'revives': p.revives, 'recall': p.recall, 'rating': p.rating,
-            'survival_time_sec': p.survival_time_sec, 
-            'team_rank': match_event.team_rank # Include overall rank
-        }
-        recommendations = generate_recommendations(stats_dict, is_overall=False)
-        
+    for p in records:
         performances.append({
             'id': p.id, 'player_ign': p.player_ign,
             'kills': p.kills, 'assists': p.assists, 'damage': p.damage, 'revives': p.revives,
             'survival_time_sec': p.survival_time_sec, 'recall': p.recall, 'rating': p.rating,
-            'recommendations': recommendations # <-- Add recommendations
+            'recommendations': recommendations_for(p) # <-- Add recommendations
         })
         
     return jsonify({
@@ -225,144 +369,127 @@ def get_single_match_event(event_id):
 @api.route('/matches/<int:event_id>', methods=['DELETE'])
 @login_required
 def delete_match(event_id):
-    match = MatchEvent.query.get(event_id)
-    if not match or match.uploaded_by_id != current_user.id:
+    deleted, _ = delete_matches(current_user.id, [event_id])
+    if not deleted:
         return jsonify({'message': 'Match not found or unauthorized'}), 404
-    db.session.delete(match)
-    db.session.commit()
     return jsonify({'message': 'Match deleted successfully'}), 200
 
+@api.route('/matches/bulk-delete', methods=['POST'])
+@login_required
+def bulk_delete_matches():
+    """Deletes the caller's matches by `match_ids` and/or a `date_from`..`date_to` range (YYYY-MM-DD, inclusive).
+    With both, only matches satisfying both are deleted. Ids of other managers' matches are reported as not found."""
+    data = request.get_json(silent=True) or {}
+    match_ids = data.get('match_ids')
+    if match_ids is not None and (not isinstance(match_ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in match_ids)):
+        return jsonify({'message': 'match_ids must be a list of integers.'}), 400
+    if match_ids is not None and len(match_ids) > MAX_DELETE_IDS:
+        return jsonify({'message': f'At most {MAX_DELETE_IDS} match_ids per request.'}), 400
+    try:
+        date_from = datetime.strptime(data['date_from'], '%Y-%m-%d') if data.get('date_from') else None
+        date_to = datetime.strptime(data['date_to'], '%Y-%m-%d') if data.get('date_to') else None
+    except (ValueError, TypeError):
+        return jsonify({'message': 'Invalid date (use YYYY-MM-DD).'}), 400
+    if not match_ids and not date_from and not date_to:
+        return jsonify({'message': 'Provide match_ids or a date_from/date_to range.'}), 400
+
+    deleted, performances = delete_matches(current_user.id, match_ids, date_from, date_to + timedelta(days=1) if date_to else None)
+    return jsonify({
+        'deleted_matches': len(deleted), 'deleted_performances': performances,
+        'not_found': sorted(set(match_ids) - set(deleted)) if match_ids else []
+    }), 200
+
 @api.route('/upload-match-result', methods=['POST'])
 @login_required
 def upload_match_result():
     if 'file' not in request.files: return jsonify({'message': 'No file part'}), 400
     file = request.files['file']
     if not file or file.filename == '': return jsonify({'message': 'No selected file'}), 400
-    filepath = None
     try:
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(current_app.root_path, filename)
-        file.save(filepath)
-        key_path = os.path.join(os.path.dirname(current_app.root_path), 'gcp_key.json')
-        os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = key_path
-        client = vision.ImageAnnotatorClient()
-        with open(filepath, 'rb') as image_file: content = image_file.read()
-        image = vision.Image(content=content)
-        response = client.text_detection(image=image)
-        os.remove(filepath)
-        filepath = None
-        if response.error.message: raise Exception(f'Google Vision Error: {response.error.message}')
-        texts = response.text_annotations
-        if not texts: return jsonify({'message': 'OCR could not read any text.'}), 400
-
-        # --- FINAL COORDINATE-BASED PARSING LOGIC ---
-        headers = {}
-        header_candidates = ['finishes', 'assists', 'damage', 'survived', 'rescue', 'recall', 'rating']
-        header_y_coord = 0
-        for text in texts:
-            desc = text.description.lower()
-            if desc in header_candidates:
-                x_center = (text.bounding_poly.vertices[0].x + text.bounding_poly.vertices[1].x) / 2
-                headers[desc] = x_center
-                header_y_coord = (text.bounding_poly.vertices[0].y + text.bounding_poly.vertices[2].y) / 2
-
-        players = []
-        blacklist = ['player', 'weapon', 'report', 'mvp', 'sss', 'back', 'share', 'krafion', 'bgmi']
-        blacklist.extend(header_candidates)
-        for text in texts:
-            desc = text.description
-            if any(c.isalpha() for c in desc) and desc.lower() not in blacklist and len(desc.split()) <= 2:
-                y_center = (text.bounding_poly.vertices[0].y + text.bounding_poly.vertices[2].y) / 2
-                if text.bounding_poly.vertices[0].x < 500 and y_center > (header_y_coord + 10):
-                    if not any(abs(p['y'] - y_center) < 15 for p in players):
-                        players.append({'ign': desc, 'y': y_center, 'stats': {}})
-
-        for text in texts:
-            desc = text.description
-            is_stat_value = desc.replace('.', '', 1).isdigit() or (desc.lower().endswith('m') and desc[:-1].replace('.', '', 1).isdigit())
-            if is_stat_value:
-                x = (text.bounding_poly.vertices[0].x + text.bounding_poly.vertices[1].x) / 2
-                y = (text.bounding_poly.vertices[0].y + text.bounding_poly.vertices[2].y) / 2
-                closest_player = min(players, key=lambda p: abs(p['y'] - y), default=None)
-                if not closest_player or abs(closest_player['y'] - y) > 30: continue
-                closest_header = min(headers.keys(), key=lambda h: abs(headers[h] - x), default=None)
-                if not closest_header or abs(headers[closest_header] - x) > 100: continue
-                closest_player['stats'][closest_header] = desc
-
-        full_text_string = texts[0].description
-        team_rank_line = next((line for line in full_text_string.split('\n') if re.search(r'#\d+', line) and len(line) < 15), None)
-        team_rank = int(re.findall(r'\d+', team_rank_line.replace('I', '1'))[0]) if team_rank_line else 99
-        map_line = next((line for line in full_text_string.split('\n') if 'Ranked Classic' in line), None)
-        map_name = map_line.split('-')[-1].strip() if map_line else "Unknown"
-        new_match_event = MatchEvent(uploaded_by_id=current_user.id, map_name=map_name, team_rank=team_rank)
-        db.session.add(new_match_event)
-
-        roster = [p.player_ign for p in RosterPlayer.query.filter_by(manager_id=current_user.id).all()]
-        
-        found_players_count = 0
-        for player_data in players:
-            stats = player_data['stats']
-            if 'finishes' in stats:
-                ocr_ign = player_data['ign']
-                matches = get_close_matches(ocr_ign, roster, n=1, cutoff=0.7)
-                if matches:
-                    canonical_ign = matches[0]
-                    survival_sec = 0.0
-                    survival_str = stats.get('survived', '0m')
-                    if 'm' in survival_str:
-                        try: survival_sec = float(survival_str.replace('m', '')) * 60
-                        except ValueError: pass
-                    try:
-                        performance = PerformanceRecord(
-                            match_event=new_match_event, player_ign=canonical_ign,
-                            kills=int(float(stats.get('finishes', 0))),
-                            assists=int(float(stats.get('assists', 0))),
-                            damage=int(float(stats.get('damage', 0))),
-                            revives=int(float(stats.get('rescue', 0))),
-                            survival_time_sec=survival_sec,
-                            recall=int(float(stats.get('recall', 0))),
-                            rating=float(stats.get('rating', 0.0))
-                        )
-                        db.session.add(performance)
-                        found_players_count += 1
-                    except (ValueError, TypeError):
-                        print(f"Skipping potentially invalid stats for {canonical_ign}: {stats}")
-                        continue
-        
-        if found_players_count == 0:
-            db.session.rollback()
-            return jsonify({'message': 'Could not parse or match any valid player stats.'}), 400
-
-        db.session.commit()
+        content = file.read() # kept in memory; the OCR layer crops and downscales it
+        with ocr_admission(current_user.id), ocr_timer():
+            result = get_ocr_backend(current_app).detect_batch([content])[0]
+        if result.error: raise Exception(result.error)
+        found_players_count, _ = save_match_from_annotations(result.texts, current_user.id)
         return jsonify({'message': f'Successfully saved stats for {found_players_count} matched players.'}), 201
+    except AdmissionRejected as e:
+        return jsonify({'message': str(e)}), e.status, {'Retry-After': str(e.retry_after)}
+    except IngestError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
-        if filepath and os.path.exists(filepath): os.remove(filepath)
         db.session.rollback()
         return jsonify({'message': f'An error occurred: {str(e)}'}), 500
+
+@api.route('/upload-jobs', methods=['POST'])
+@login_required
+def create_upload_jobs():
+    """Queues one OCR job per screenshot and returns immediately; poll /upload-jobs/<id> for results."""
+    files = [f for f in request.files.getlist('files') + request.files.getlist('file') if f and f.filename]
+    if not files: return jsonify({'message': 'No selected file'}), 400
+    max_files = current_app.config['OCR_MAX_FILES']
+    if len(files) > max_files:
+        return jsonify({'message': f'Too many files. Upload at most {max_files} screenshots at once.'}), 400
+    uploads = [(secure_filename(f.filename), f.read()) for f in files]
+    jobs = enqueue_uploads(current_app._get_current_object(), current_user.id, uploads)
+    return jsonify({'jobs': [job.to_dict() for job in jobs]}), 202
+
+@api.route('/upload-jobs/<job_id>')
+@login_required
+def get_upload_job(job_id):
+    job = db.session.get(UploadJob, job_id)
+    if not job or job.user_id != current_user.id:
+        return jsonify({'message': 'Upload job not found or unauthorized'}), 404
+    return jsonify(job.to_dict())
+
+@api.route('/upload-jobs')
+@login_required
+def get_upload_jobs():
+    ids = [i for i in request.args.get('ids', '').split(',') if i]
+    query = UploadJob.query.filter_by(user_id=current_user.id)
+    if ids: query = query.filter(UploadJob.id.in_(ids))
+    jobs = query.order_by(UploadJob.created_at.desc()).limit(50).all()
+    return jsonify([job.to_dict() for job in jobs])
+
+@api.route('/ocr/cache-stats')
+@login_required
+def ocr_cache_stats():
+    return jsonify(get_ocr_cache_stats())
+
+@api.route('/ocr/admission')
+@login_required
+def ocr_admission_stats():
+    """Live OCR admission state: in-flight calls, queue depth, wait times and rejections."""
+    return jsonify(admission_stats())
         
 
 # --- ANALYTICS ROUTE ---
 
+TEAM_SORT_KEYS = ['total_matches', 'win_rate'] + [f'avg_{f}' for f in STAT_FIELDS]
+
+def _aggregate_summary(aggregate):
+    """Averages and win rate from a PlayerAggregate row; shared by the overview and team views."""
+    total_matches = aggregate.matches if aggregate else 0
+    summary = {'total_matches': total_matches}
+    for f in STAT_FIELDS:
+        summary[f'avg_{f}'] = getattr(aggregate, f'sum_{f}') / total_matches if total_matches else 0
+    summary['win_rate_raw'] = (aggregate.wins / total_matches) * 100 if total_matches else 0
+    return summary
+
+def _rounded_summary(summary):
+    rounded = {'total_matches': summary['total_matches'], 'win_rate': round(summary['win_rate_raw'], 2)}
+    rounded.update({f'avg_{f}': round(summary[f'avg_{f}'], 2) for f in STAT_FIELDS})
+    return rounded
+
 @api.route('/stats/overview')
 @login_required
+@cached_response
 def get_overview_stats():
     player_ign = request.args.get('player_ign')
     if not player_ign: return jsonify({'message': 'player_ign parameter is required.'}), 400
 
-    # --- UPDATED QUERY ---
-    # We now calculate averages for all the new fields
-    stats = db.session.query(
-        func.count(PerformanceRecord.id).label('total_matches'),
-        func.avg(PerformanceRecord.kills).label('avg_kills'),
-        func.avg(PerformanceRecord.damage).label('avg_damage'),
-        func.avg(PerformanceRecord.assists).label('avg_assists'),
-        func.avg(PerformanceRecord.revives).label('avg_revives'),
-        func.avg(PerformanceRecord.survival_time_sec).label('avg_survival_time_sec'),
-        func.avg(PerformanceRecord.recall).label('avg_recall'),
-        func.avg(PerformanceRecord.rating).label('avg_rating')
-    ).filter(PerformanceRecord.player_ign.ilike(player_ign)).first()
-
-    total_matches = stats.total_matches or 0
+    # Running totals are maintained on every write (see aggregates.py), so this is one row lookup
+    aggregate = db.session.get(PlayerAggregate, (current_user.id, ign_key(player_ign)))
+    total_matches = aggregate.matches if aggregate else 0
     
     # Define overall_recommendations as empty list by default
     overall_recommendations = []
@@ -374,22 +501,21 @@ def get_overview_stats():
             avg_recall=0, avg_rating=0, recent_performance={},
             overall_recommendations=overall_recommendations
         ), 200
+
+    summary = _aggregate_summary(aggregate)
     
-    win_count = db.session.query(func.count(MatchEvent.id)).join(PerformanceRecord).filter(
-        PerformanceRecord.player_ign.ilike(player_ign),
-        MatchEvent.team_rank == 1
-    ).scalar()
-    win_rate = (win_count / total_matches) * 100 if total_matches > 0 else 0
-    
-    recent = PerformanceRecord.query.filter(PerformanceRecord.player_ign.ilike(player_ign)).order_by(PerformanceRecord.id.desc()).limit(20).all()
+    recent = PerformanceRecord.query.join(MatchEvent).filter(
+        MatchEvent.uploaded_by_id == current_user.id,
+        PerformanceRecord.player_ign_norm == ign_key(player_ign)
+    ).options(contains_eager(PerformanceRecord.match_event)).order_by(PerformanceRecord.id.desc()).limit(20).all()
     recent.reverse()
     
     # --- Generate Overall Recommendations ---
     avg_stats_dict = {
-        'kills': stats.avg_kills or 0,
-        'damage': stats.avg_damage or 0,
-        'assists': stats.avg_assists or 0,
-        'win_rate': win_rate,
+        'kills': summary['avg_kills'],
+        'damage': summary['avg_damage'],
+        'assists': summary['avg_assists'],
+        'win_rate': summary['win_rate_raw'],
     }
     # This line now correctly updates the existing list
     from .recommendation_engine import generate_recommendations
@@ -397,15 +523,7 @@ def get_overview_stats():
     
     # --- UPDATED RESPONSE ---
     return jsonify({
-        'total_matches': total_matches,
-        'avg_kills': round(stats.avg_kills or 0, 2),
-        'avg_damage': round(stats.avg_damage or 0, 2),
-        'win_rate': round(win_rate, 2),
-        'avg_assists': round(stats.avg_assists or 0, 2),
-        'avg_revives': round(stats.avg_revives or 0, 2),
-        'avg_survival_time_sec': round(stats.avg_survival_time_sec or 0, 2),
-        'avg_recall': round(stats.avg_recall or 0, 2),
-        'avg_rating': round(stats.avg_rating or 0, 2),
+        **_rounded_summary(summary),
         'recent_performance': {
             'labels': [p.match_event.match_date.strftime('%b %d') for p in recent],
             'kills_data': [p.kills for p in recent]
@@ -413,6 +531,82 @@ def get_overview_stats():
         'overall_recommendations': overall_recommendations
     })
 
+@api.route('/stats/team')
+@login_required
+@cached_response
+def get_team_stats():
+    """Leaderboard for the whole roster in two queries (roster + aggregates), same numbers as /stats/overview."""
+    sort = request.args.get('sort', 'total_matches')
+    if sort not in TEAM_SORT_KEYS:
+        return jsonify({'message': f"Invalid sort. Use one of: {', '.join(TEAM_SORT_KEYS)}."}), 400
+    descending = request.args.get('order', 'desc') != 'asc'
+    try:
+        limit = int(request.args['limit']) if 'limit' in request.args else None
+    except ValueError:
+        return jsonify({'message': 'Invalid limit.'}), 400
+
+    roster = [ign for (ign,) in db.session.query(RosterPlayer.player_ign).filter(RosterPlayer.manager_id == current_user.id).distinct().all()]
+    keys = {ign_key(ign) for ign in roster}
+    aggregates = {a.player_ign_key: a for a in PlayerAggregate.query.filter(
+        PlayerAggregate.manager_id == current_user.id, PlayerAggregate.player_ign_key.in_(keys)
+    ).all()} if keys else {}
+
+    leaderboard = []
+    for ign in roster:
+        summary = _aggregate_summary(aggregates.get(ign_key(ign)))
+        leaderboard.append({'player_ign': ign, 'sort_value': summary[sort if sort != 'win_rate' else 'win_rate_raw'], **_rounded_summary(summary)})
+    leaderboard.sort(key=lambda row: (row['sort_value'], row['player_ign']), reverse=descending)
+    for row in leaderboard: del row['sort_value']
+    return jsonify(leaderboard[:limit] if limit is not None and limit >= 0 else leaderboard)
+
+# --- BULK EXPORT ROUTE ---
+
+@api.route('/export')
+@login_required
+def export_data():
+    """Streams every performance (joined with its match) as csv, ndjson or parquet."""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'message': f"Invalid format. Use one of: {', '.join(EXPORT_FORMATS)}."}), 400
+    if fmt == 'parquet' and not parquet_available():
+        return jsonify({'message': 'Parquet export requires pyarrow to be installed on the server.'}), 400
+    try:
+        date_from = _parse_date_arg('date_from')
+        date_to = _parse_date_arg('date_to')
+    except ValueError:
+        return jsonify({'message': 'Invalid date (use YYYY-MM-DD).'}), 400
+
+    stmt = export_query(current_user.id, request.args.get('map_name'), date_from, date_to + timedelta(days=1) if date_to else None)
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    response = Response(stream_with_context(STREAMERS[fmt](stmt)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=fdanalytics-export.{extension}'
+    return response
+
+# --- BULK IMPORT ROUTE ---
+
+@api.route('/import', methods=['POST'])
+@login_required
+def import_data():
+    """Imports many matches from a CSV or NDJSON upload ('file' field, or the raw request body)."""
+    upload = request.files.get('file')
+    fmt = request.args.get('format')
+    if not fmt and upload and upload.filename:
+        fmt = upload.filename.rsplit('.', 1)[-1].lower()
+    if not fmt:
+        fmt = 'ndjson' if 'ndjson' in (request.mimetype or '') else 'csv'
+    fmt = 'ndjson' if fmt in ('ndjson', 'jsonl') else fmt
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'message': 'Invalid format. Use csv or ndjson.'}), 400
+    try:
+        report = import_matches(current_user.id, upload.stream if upload else request.stream, fmt)
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return jsonify({'message': 'File must be UTF-8 encoded.'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'message': f'An error occurred: {str(e)}'}), 500
+    return jsonify(report.to_dict()), 201 if report.matches_imported else 400
+
 # --- MANUAL MATCH ENTRY ROUTE ---
 #     
 @api.route('/add-manual-match', methods=['POST'])
@@ -421,37 +615,30 @@ def add_manual_match():
     data = request.get_json()
     if not data or 'team_rank' not in data or 'performances' not in data:
         return jsonify({'message': 'Missing required data.'}), 400
+    try:
+        team_rank = int(data['team_rank'])
+    except (ValueError, TypeError):
+        return jsonify({'message': 'Invalid Team Rank format.'}), 400
 
     try:
         new_match_event = MatchEvent(
             uploaded_by_id=current_user.id,
             map_name=data.get('map_name'),
-            team_rank=data.get('team_rank')
+            team_rank=team_rank
         )
         db.session.add(new_match_event)
+        matcher = get_roster_matcher(current_user.id)
+        seen = set()
         
         for p in data['performances']:
             if not p.get('player_ign'): continue # Skip if no player name provided
-
-            # --- Convert survival time M:S to seconds ---
-            survival_sec = 0.0
-            if 'survival_minutes' in p or 'survival_seconds' in p:
-                 mins = int(p.get('survival_minutes', 0))
-                 secs = int(p.get('survival_seconds', 0))
-                 survival_sec = (mins * 60) + secs
-
-            performance = PerformanceRecord(
-                match_event=new_match_event,
-                player_ign=p.get('player_ign'),
-                kills=int(p.get('kills', 0)),
-                assists=int(p.get('assists', 0)),
-                damage=int(p.get('damage', 0)),
-                revives=int(p.get('revives', 0)),
-                # --- Save new fields ---
-                survival_time_sec=survival_sec,
-                recall=int(p.get('recall', 0)),
-                rating=float(p.get('rating', 0.0))
-            )
+            values = manual_performance_values(p)
+            values['player_ign'] = matcher.resolve(values['player_ign']) # known aliases go to the canonical IGN
+            if values['player_ign'] in seen:
+                db.session.rollback()
+                return jsonify({'message': f"{values['player_ign']} is listed more than once."}), 400
+            seen.add(values['player_ign'])
+            performance = PerformanceRecord(match_event=new_match_event, **values)
             db.session.add(performance)
         
         db.session.commit()
@@ -480,8 +667,6 @@ def update_performance_record(perf_id):
     if not data:
         return jsonify({'message': 'No data provided'}), 400
 
-    roster = [p.player_ign for p in RosterPlayer.query.filter_by(manager_id=current_user.id).all()]
-
     try:
         # --- Handle IGN Change and Merging ---
         if 'player_ign' in data and data['player_ign'] != record.player_ign:
@@ -490,19 +675,22 @@ def update_performance_record(perf_id):
                 return jsonify({'message': 'Player IGN cannot be empty.'}), 400
             
             # Find the closest match in the current roster (excluding the player's own old name)
-            current_roster_without_self = [ign for ign in roster if ign != record.player_ign]
-            matches = get_close_matches(new_ign, current_roster_without_self, n=1, cutoff=0.9) # Higher cutoff for manual edit
+            matched_ign = get_roster_matcher(current_user.id).best_match(new_ign, cutoff=0.9, exclude=record.player_ign) # Higher cutoff for manual edit
+            if PerformanceRecord.query.filter(PerformanceRecord.match_id == record.match_id, PerformanceRecord.player_ign == (matched_ign or new_ign),
+                                              PerformanceRecord.id != record.id).first():
+                return jsonify({'message': f'{matched_ign or new_ign} already has stats for this match.'}), 409
 
-            if matches:
+            if matched_ign:
                 # Merge into existing player: Update this record's IGN to the matched name
-                print(f"Merging record {perf_id} from {record.player_ign} to {matches[0]}")
-                record.player_ign = matches[0]
+                old_ign = record.player_ign
+                print(f"Merging record {perf_id} from {old_ign} to {matched_ign}")
+                record.player_ign = matched_ign
                 # Optional: Delete the old roster entry if no other records use it
-                old_ign_entry = RosterPlayer.query.filter_by(manager_id=current_user.id, player_ign=record.player_ign).first()
+                old_ign_entry = RosterPlayer.query.filter_by(manager_id=current_user.id, player_ign=old_ign).first()
                 # Check if any *other* performance record still uses the old IGN for this manager
                 other_records_exist = PerformanceRecord.query.join(MatchEvent).filter(
                     MatchEvent.uploaded_by_id == current_user.id,
-                    PerformanceRecord.player_ign == record.player_ign,
+                    PerformanceRecord.player_ign == old_ign,
                     PerformanceRecord.id != perf_id # Exclude the current record
                 ).first()
                 if old_ign_entry and not other_records_exist:
@@ -535,6 +723,7 @@ def update_performance_record(perf_id):
         return jsonify({'message': 'Invalid data format for stats.'}), 400
 
     db.session.commit()
+    invalidate_roster_matcher(current_user.id) # the IGN change may have renamed or dropped a roster entry
     return jsonify({'message': f'Stats for {record.player_ign} updated.'}), 200
 
 # --- NEW: DELETE Single Performance Record ---
@@ -562,7 +751,7 @@ def add_performance_record(event_id):
     if not data or 'player_ign' not in data or not data['player_ign'].strip():
         return jsonify({'message': 'Player IGN is required and cannot be empty.'}), 400
 
-    player_ign = data['player_ign'].strip()
+    player_ign = get_roster_matcher(current_user.id).resolve(data['player_ign'].strip())
 
     # Check if player already exists for this match
     existing = PerformanceRecord.query.filter_by(match_id=event_id, player_ign=player_ign).first()
@@ -589,6 +778,7 @@ def add_performance_record(event_id):
         )
         db.session.add(performance)
         db.session.commit()
+        if not roster_entry: invalidate_roster_matcher(current_user.id)
         return jsonify({'message': f'Performance added for {player_ign}.'}), 201
     except (ValueError, TypeError):
         db.session.rollback()
@@ -0,0 +1,104 @@
+import re
+from bisect import bisect_left
+import numpy as np
+
+# --- COORDINATE-BASED SCOREBOARD PARSER ---
+# Pure function over OCR token boxes (app/ocr.py TokenBox, or anything with `description`
+# and `vertices`), so it can be unit-tested and benchmarked without Flask or a database.
+#
+# Header x-centres and player-row y-centres are kept as sorted arrays; every numeric
+# token is then assigned to its (player row, header column) cell with one
+# searchsorted pass instead of a linear min() per token.
+
+HEADER_CANDIDATES = ['finishes', 'assists', 'damage', 'survived', 'rescue', 'recall', 'rating']
+BLACKLIST = set(['player', 'weapon', 'report', 'mvp', 'sss', 'back', 'share', 'krafion', 'bgmi'] + HEADER_CANDIDATES)
+
+PLAYER_MAX_X = 500 # player names sit in the left-hand column
+PLAYER_MIN_GAP = 15 # two names closer than this (px) are the same row
+ROW_TOLERANCE = 30 # max vertical distance from a stat to its player row
+COLUMN_TOLERANCE = 100 # max horizontal distance from a stat to its header
+
+
+def _is_stat_value(desc):
+    return desc.replace('.', '', 1).isdigit() or (desc.lower().endswith('m') and desc[:-1].replace('.', '', 1).isdigit())
+
+
+def _nearest(sorted_values, order, points):
+    """For each point, index (into the unsorted original list) of the nearest value and its distance.
+    Ties go to the value that appeared first, matching min() over the original list."""
+    n = len(sorted_values)
+    pos = np.searchsorted(sorted_values, points)
+    # Snap to the first of any run of equal values; the stable sort put the earliest one there
+    left = np.searchsorted(sorted_values, sorted_values[np.clip(pos - 1, 0, n - 1)])
+    right = np.searchsorted(sorted_values, sorted_values[np.clip(pos, 0, n - 1)])
+    dist_left = np.abs(points - sorted_values[left])
+    dist_right = np.abs(points - sorted_values[right])
+    take_left = (dist_left < dist_right) | ((dist_left == dist_right) & (order[left] <= order[right]))
+    nearest = np.where(take_left, order[left], order[right])
+    return nearest, np.where(take_left, dist_left, dist_right)
+
+
+def parse_scoreboard(texts):
+    """Parses a BGMI results screen.
+
+    Returns {'team_rank', 'map_name', 'header_y', 'headers': {name: x}, 'players': [{'ign', 'y', 'stats'}]}
+    where stats maps header names to the raw OCR strings (e.g. {'finishes': '5', 'survived': '19.3m'})."""
+    headers = {}
+    header_y = 0
+    name_tokens = []
+    stat_tokens = []
+
+    # Single pass: classify every token and compute its bounding-box centre
+    for text in texts:
+        desc = text.description
+        v = text.vertices
+        x_center = (v[0][0] + v[1][0]) / 2
+        y_center = (v[0][1] + v[2][1]) / 2
+        lowered = desc.lower()
+        if lowered in HEADER_CANDIDATES:
+            headers[lowered] = x_center
+            header_y = y_center
+        if any(c.isalpha() for c in desc) and lowered not in BLACKLIST and len(desc.split()) <= 2:
+            name_tokens.append((desc, v[0][0], y_center))
+        if _is_stat_value(desc):
+            stat_tokens.append((desc, x_center, y_center))
+
+    # Player rows: first name seen for each band of PLAYER_MIN_GAP px wins
+    players = []
+    row_ys = [] # sorted y-centres of accepted players
+    for desc, left_x, y in name_tokens:
+        if left_x >= PLAYER_MAX_X or y <= header_y + 10: continue
+        i = bisect_left(row_ys, y)
+        if (i > 0 and y - row_ys[i - 1] < PLAYER_MIN_GAP) or (i < len(row_ys) and row_ys[i] - y < PLAYER_MIN_GAP): continue
+        row_ys.insert(i, y)
+        players.append({'ign': desc, 'y': y, 'stats': {}})
+
+    if players and headers and stat_tokens:
+        player_y = np.array([p['y'] for p in players], dtype=float)
+        player_order = np.argsort(player_y, kind='stable')
+        header_names = list(headers)
+        header_x = np.array([headers[h] for h in header_names], dtype=float)
+        header_order = np.argsort(header_x, kind='stable')
+
+        xs = np.array([t[1] for t in stat_tokens], dtype=float)
+        ys = np.array([t[2] for t in stat_tokens], dtype=float)
+        row, row_dist = _nearest(player_y[player_order], player_order, ys)
+        col, col_dist = _nearest(header_x[header_order], header_order, xs)
+        valid = (row_dist <= ROW_TOLERANCE) & (col_dist <= COLUMN_TOLERANCE)
+
+        # Later tokens overwrite earlier ones in the same cell, as OCR order intends
+        for t in np.flatnonzero(valid):
+            players[row[t]]['stats'][header_names[col[t]]] = stat_tokens[t][0]
+
+    team_rank, map_name = parse_match_info(texts[0].description if texts else '')
+    return {'team_rank': team_rank, 'map_name': map_name, 'header_y': header_y, 'headers': headers, 'players': players}
+
+
+def parse_match_info(full_text_string):
+    """Extracts (team_rank, map_name) from the full OCR text block."""
+    lines = full_text_string.split('\n')
+    team_rank_line = next((line for line in lines if re.search(r'#\d+', line) and len(line) < 15), None)
+    team_rank = int(re.findall(r'\d+', team_rank_line.replace('I', '1'))[0]) if team_rank_line else 99
+    map_line = next((line for line in lines if 'Ranked Classic' in line), None)
+    map_name = map_line.split('-')[-1].strip() if map_line else "Unknown"
+    return team_rank, map_name
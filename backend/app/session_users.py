@@ -0,0 +1,52 @@
+from flask import current_app
+from flask_login import UserMixin
+from . import db
+from .models import User
+from .response_cache import LocalCacheBackend, RedisCacheBackend
+
+# --- CACHED SESSION USERS ---
+# Flask-Login loads the user on every authenticated request. Instead of a users-table
+# read each time, routes get a read-only snapshot of the profile columns, cached for
+# USER_CACHE_TTL seconds. update_profile and logout drop the entry, which every worker
+# sees only with the shared backend (RESPONSE_CACHE_URL), so the cache is on by default
+# only then. Code that writes to the user row, or that must see its current values,
+# loads the real model with db.session.get(User, current_user.id).
+
+SESSION_FIELDS = ['id', 'username', 'email', 'first_name', 'last_name', 'bgmi_username', 'bio', 'country', 'instagram_url', 'youtube_url']
+
+
+class SessionUser(UserMixin):
+    """Detached copy of a User's profile columns; what current_user is on every request."""
+
+    def __init__(self, values):
+        self.__dict__.update(values)
+
+
+def init_user_cache(app):
+    if not app.config.get('USER_CACHE_TTL'):
+        cache = None
+    elif app.config.get('RESPONSE_CACHE_URL'):
+        cache = RedisCacheBackend(app.config['RESPONSE_CACHE_URL'])
+    else:
+        cache = LocalCacheBackend(app.config.get('USER_CACHE_SIZE', 1024))
+    app.extensions['user_cache'] = cache
+
+
+def _key(user_id):
+    return f'fda:u:{user_id}'
+
+
+def load_session_user(user_id):
+    cache = current_app.extensions.get('user_cache')
+    values = cache.get(_key(user_id)) if cache else None
+    if values is None:
+        user = db.session.get(User, int(user_id))
+        if user is None: return None
+        values = {f: getattr(user, f) for f in SESSION_FIELDS}
+        if cache: cache.set(_key(user_id), values, current_app.config['USER_CACHE_TTL'])
+    return SessionUser(values)
+
+
+def invalidate_session_user(user_id):
+    cache = current_app.extensions.get('user_cache')
+    if cache: cache.delete(_key(user_id))
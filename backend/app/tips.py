@@ -0,0 +1,57 @@
+import random
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from .models import MatchEvent, PerformanceRecord
+from .recommendation_engine import match_tip_codes, render_tips, THRESHOLDS_VERSION
+from .aggregates import match_for_record
+
+# --- STORED RECOMMENDATIONS ---
+# Tip codes are computed once when a performance is written (or its match's rank
+# changes) and stored on the row, so match detail reads are lookups. Phrasing is
+# picked with an RNG seeded by the record id, so the text is stable between loads.
+# create_app() calls init_tips() to register the flush hook that keeps the codes current.
+
+TIP_INPUTS = ['kills', 'damage', 'assists', 'revives', 'rating', 'survival_time_sec']
+
+
+def compute_tip_codes(rows):
+    """rows: list of dicts with TIP_INPUTS + team_rank. Returns the stored string per row."""
+    if not rows: return []
+    codes = match_tip_codes(*[[row.get(f) for row in rows] for f in ('kills', 'damage', 'assists', 'revives', 'team_rank', 'rating', 'survival_time_sec')])
+    return [','.join(c) for c in codes]
+
+
+def refresh_tip_codes(records, team_rank_for):
+    values = compute_tip_codes([dict({f: getattr(r, f) for f in TIP_INPUTS}, team_rank=team_rank_for(r)) for r in records])
+    for record, codes in zip(records, values):
+        record.tip_codes = codes
+        record.tips_version = THRESHOLDS_VERSION
+
+
+def recommendations_for(record):
+    codes = record.tip_codes.split(',') if record.tip_codes else []
+    return render_tips(codes, record.rating, random.Random(record.id))
+
+
+def _store_tip_codes(session, flush_context, instances):
+    stale = []
+    with session.no_autoflush:
+        for obj in session.new:
+            if isinstance(obj, PerformanceRecord): stale.append(obj)
+        for obj in session.dirty:
+            if isinstance(obj, PerformanceRecord) and obj not in session.deleted:
+                state = inspect(obj)
+                if any(state.attrs[f].history.has_changes() for f in TIP_INPUTS): stale.append(obj)
+            elif isinstance(obj, MatchEvent) and obj not in session.deleted and inspect(obj).attrs.team_rank.history.has_changes():
+                stale.extend(obj.performances)
+
+        def team_rank_for(record):
+            match = match_for_record(session, record)
+            return match.team_rank if match is not None else None
+        refresh_tip_codes(list(dict.fromkeys(stale)), team_rank_for)
+
+
+def init_tips(app):
+    """Registers the before_flush hook on every Session (once, however many apps are created)."""
+    if not event.contains(Session, 'before_flush', _store_tip_codes):
+        event.listen(Session, 'before_flush', _store_tip_codes)
@@ -0,0 +1,227 @@
+"""Micro-benchmarks for the backend hot paths, reported as JSON.
+
+Seeds a database (see seed.py) unless it already holds data, then times:
+  - GET /api/matches (full legacy list, the same as ?format=columnar, one keyset page)
+  - GET /api/stats/overview for a roster player
+  - GET /api/matches/<id>
+  - parse_scoreboard over OCR annotation fixtures
+  - roster fuzzy matching of OCR-mangled names
+  - generate_recommendations, per match and overall
+
+    python benchmarks/hot_paths.py --matches 20000 --output after.json --compare before.json
+
+Endpoints run through the Flask test client with the response cache off, so every
+call does the real work. --fixtures takes a directory of recorded annotation JSON
+files (the on-disk token format, e.g. an OCR_RECORD_DIR recording); without it,
+synthetic scoreboards are used.
+With --compare, exits non-zero if any median is more than --threshold times slower.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from seed import seed_database, make_igns, noisy_ign, scoreboard_annotations, PASSWORD # noqa: E402
+
+
+def timed(fn, repeat, warmup=1):
+    for _ in range(warmup): fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        'median_ms': round(statistics.median(samples), 3),
+        'p95_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        'min_ms': round(samples[0], 3),
+        'runs': repeat,
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def endpoint_cases(app, repeat, rng):
+    from app import db
+    from app.models import User, MatchEvent, RosterPlayer
+
+    with app.app_context():
+        manager = User.query.filter(User.username.like('bench-manager-%')).order_by(User.id).first()
+        roster = [r.player_ign for r in RosterPlayer.query.filter_by(manager_id=manager.id)]
+        match_ids = [m for (m,) in db.session.query(MatchEvent.id).filter_by(uploaded_by_id=manager.id)]
+        username = manager.username
+
+    client = app.test_client()
+    response = client.post('/api/login', json={'username': username, 'password': PASSWORD})
+    assert response.status_code == 200, response.get_json()
+
+    def get(url, **kwargs):
+        def call():
+            response = client.get(url() if callable(url) else url, **kwargs)
+            assert response.status_code == 200, (response.status_code, response.get_data()[:200])
+            return response
+        return call
+
+    payload_bytes = {
+        'legacy': len(get('/api/matches')().get_data()),
+        'columnar': len(get('/api/matches?format=columnar')().get_data()),
+        'columnar_gzip': len(get('/api/matches?format=columnar', headers={'Accept-Encoding': 'gzip'})().get_data()),
+    }
+    return {
+        'get_matches_full': timed(get('/api/matches'), max(1, repeat // 5)),
+        'get_matches_full_columnar': timed(get('/api/matches?format=columnar'), max(1, repeat // 5)),
+        'get_matches_page': timed(get('/api/matches?limit=50'), repeat),
+        'get_overview_stats': timed(get(lambda: f'/api/stats/overview?player_ign={rng.choice(roster)}'), repeat),
+        'get_single_match_event': timed(get(lambda: f'/api/matches/{rng.choice(match_ids)}'), repeat),
+    }, {'matches_for_manager': len(match_ids), 'get_matches_bytes': payload_bytes}
+
+
+def parser_case(fixtures_dir, repeat, rng):
+    from app.ocr import FakeOCRBackend
+    from app.scoreboard_parser import parse_scoreboard
+
+    if fixtures_dir:
+        contents = []
+        for path in sorted(glob.glob(os.path.join(fixtures_dir, '*.json'))):
+            with open(path, 'rb') as f: contents.append(f.read())
+        source = fixtures_dir
+    else:
+        contents = [scoreboard_annotations(make_igns(rng, 4), rank=rng.randint(1, 18), seed=i) for i in range(20)]
+        source = 'synthetic'
+    if not contents: raise SystemExit(f'no *.json fixtures in {fixtures_dir}')
+    screenshots = [result.texts for result in FakeOCRBackend().detect_batch(contents)]
+
+    def parse_all():
+        for texts in screenshots: parse_scoreboard(texts)
+    result = timed(parse_all, repeat)
+    result['screenshots'] = len(screenshots)
+    result['source'] = source
+    return result
+
+
+def matcher_case(repeat, rng):
+    from app.ign_matcher import RosterMatcher
+
+    roster = make_igns(rng, 50)
+    words = [noisy_ign(rng, rng.choice(roster)) for _ in range(100)] + make_igns(rng, 20) # mostly near misses, some strangers
+
+    def match_all():
+        matcher = RosterMatcher(roster) # fresh each run so the memo doesn't hide the work
+        for word in words: matcher.best_match(word, cutoff=0.7)
+    result = timed(match_all, repeat)
+    result.update(roster_size=len(roster), lookups=len(words))
+    return result
+
+
+def recommendation_cases(repeat, rng):
+    from app.recommendation_engine import generate_recommendations
+
+    per_match = [{
+        'kills': rng.randint(0, 15), 'damage': rng.randint(0, 2000), 'assists': rng.randint(0, 5), 'revives': rng.randint(0, 4),
+        'team_rank': rng.randint(1, 18), 'rating': rng.uniform(10, 99), 'survival_time_sec': rng.uniform(60, 1800),
+    } for _ in range(200)]
+    overall = [{'kills': s['kills'] / 3, 'damage': s['damage'] / 3, 'assists': s['assists'], 'win_rate': rng.uniform(0, 40)} for s in per_match]
+
+    def run_per_match():
+        for stats in per_match: generate_recommendations(stats, seed=1)
+
+    def run_overall():
+        for stats in overall: generate_recommendations(stats, is_overall=True)
+    return {
+        'generate_recommendations_match': dict(timed(run_per_match, repeat), calls=len(per_match)),
+        'generate_recommendations_overall': dict(timed(run_overall, repeat), calls=len(overall)),
+    }
+
+
+def compare(report, baseline_path, threshold):
+    with open(baseline_path) as f: baseline = json.load(f)['results']
+    regressions = []
+    print(f"{'benchmark':36} {'before':>10} {'after':>10} {'ratio':>7}", file=sys.stderr)
+    for name, result in report['results'].items():
+        if name not in baseline: continue
+        before, after = baseline[name]['median_ms'], result['median_ms']
+        ratio = after / before if before else float('inf')
+        flag = '  REGRESSION' if ratio > threshold else ''
+        print(f"{name:36} {before:10.3f} {after:10.3f} {ratio:7.2f}{flag}", file=sys.stderr)
+        if flag: regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL'), help='default: a temporary SQLite file')
+    parser.add_argument('--managers', type=int, default=5)
+    parser.add_argument('--matches', type=int, default=2000, help='total seeded matches; rows = matches * (1 + players)')
+    parser.add_argument('--players', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--fixtures', help='directory of recorded OCR annotation JSON files')
+    parser.add_argument('--output', help='also write the JSON report to this file')
+    parser.add_argument('--compare', help='baseline report to compare medians against')
+    parser.add_argument('--threshold', type=float, default=1.25, help='slowdown ratio that counts as a regression')
+    args = parser.parse_args()
+
+    tmp = None
+    if not args.database_url:
+        tmp = tempfile.TemporaryDirectory()
+        args.database_url = f"sqlite:///{os.path.join(tmp.name, 'bench.db')}"
+    os.environ.update(DATABASE_URL=args.database_url, SECRET_KEY=os.environ.get('SECRET_KEY', 'bench'),
+                      OCR_BACKEND='fake', RESPONSE_CACHE_ENABLED='0', RESPONSE_CACHE_URL='')
+
+    from app import create_app, db
+    from app.migrations import run_migrations
+    from app.models import MatchEvent, PerformanceRecord
+    import sqlalchemy
+
+    app = create_app()
+    app.config['SESSION_COOKIE_SECURE'] = False # the test client talks plain http
+    with app.app_context():
+        run_migrations(echo=lambda *_: None)
+        seeded = None
+        if MatchEvent.query.first() is None:
+            started = time.perf_counter()
+            seeded = seed_database(args.managers, args.matches, args.players, seed=args.seed, echo=lambda m: print(m, file=sys.stderr))
+            seeded['seconds'] = round(time.perf_counter() - started, 1)
+        counts = {'matches': db.session.query(MatchEvent).count(), 'performances': db.session.query(PerformanceRecord).count()}
+        dialect = db.engine.dialect.name
+
+    rng = random.Random(args.seed)
+    results, dataset = endpoint_cases(app, args.repeat, rng)
+    results['parse_scoreboard'] = parser_case(args.fixtures, args.repeat, rng)
+    results['roster_matching'] = matcher_case(args.repeat, rng)
+    results.update(recommendation_cases(args.repeat, rng))
+
+    report = {
+        'meta': {
+            'revision': _git_revision(), 'python': platform.python_version(), 'sqlalchemy': sqlalchemy.__version__,
+            'database': dialect, 'rows': dict(counts, total=counts['matches'] + counts['performances'], **dataset),
+            'seeded': seeded, 'repeat': args.repeat, 'seed': args.seed,
+        },
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f: f.write(text + '\n')
+    if tmp: tmp.cleanup()
+    if args.compare and compare(report, args.compare, args.threshold): sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
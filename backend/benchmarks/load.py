@@ -0,0 +1,228 @@
+"""Load test: concurrent manager sessions against a local server with fake OCR.
+
+Starts the app in a subprocess on 127.0.0.1 (threaded Werkzeug server, temporary
+SQLite database, FakeOCRBackend with --ocr-latency seconds per call), then runs
+--users concurrent sessions for --duration seconds. Each session registers, logs
+in and builds a roster, then loops the way the frontend is used: upload a
+scoreboard screenshot, browse /matches, open a match, load the dashboard.
+Nothing leaves the machine.
+
+    python benchmarks/load.py --users 20 --duration 60 --ocr-latency 0.8 --output load.json
+
+Pass --url to drive a server you started yourself (e.g. gunicorn with
+OCR_BACKEND=fake and `flask migrate` already run) instead.
+Reports throughput, p50/p95/p99 latency and error rate per route, as JSON.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from seed import make_igns, noisy_ign, scoreboard_annotations, MAPS # noqa: E402
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVER = r'''
+import os, sys
+from werkzeug.serving import make_server
+from app import create_app
+from app.migrations import run_migrations
+app = create_app()
+app.config['SESSION_COOKIE_SECURE'] = False # plain http on loopback
+with app.app_context(): run_migrations(echo=lambda *_: None)
+server = make_server('127.0.0.1', int(sys.argv[1]), app, threaded=True)
+print('ready', flush=True)
+server.serve_forever()
+'''
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(args, db_path):
+    port = _free_port()
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}', SECRET_KEY='load', OCR_BACKEND='fake',
+               OCR_FAKE_LATENCY=str(args.ocr_latency), OCR_CACHE_MAX_BYTES='0', FRONTEND_URL='http://127.0.0.1')
+    process = subprocess.Popen([sys.executable, '-c', SERVER, str(port)], cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL if args.quiet_server else None, text=True)
+    if process.stdout.readline().strip() != 'ready':
+        process.kill()
+        raise SystemExit('server failed to start')
+    return process, f'http://127.0.0.1:{port}'
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list) # route -> [seconds]
+        self.errors = defaultdict(int)
+        self.error_examples = {}
+
+    def record(self, route, elapsed, ok, detail=None):
+        with self._lock:
+            self.samples[route].append(elapsed)
+            if not ok:
+                self.errors[route] += 1
+                self.error_examples.setdefault(route, detail)
+
+
+class ManagerSession:
+    """One simulated manager: its own cookie jar, roster and uploaded matches."""
+
+    def __init__(self, base_url, recorder, rng, args):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.rng = rng
+        self.args = args
+        self.http = requests.Session()
+        self.roster = make_igns(rng, 6)
+        self.match_ids = []
+
+    def call(self, method, path, route=None, expect=(200,), **kwargs):
+        route = f'{method} {route or path}'
+        started = time.perf_counter()
+        try:
+            response = self.http.request(method, self.base_url + path, timeout=self.args.timeout, **kwargs)
+        except requests.RequestException as e:
+            self.recorder.record(route, time.perf_counter() - started, False, repr(e))
+            return None
+        elapsed = time.perf_counter() - started
+        ok = response.status_code in expect
+        self.recorder.record(route, elapsed, ok, None if ok else f'{response.status_code}: {response.text[:200]}')
+        return response if ok else None
+
+    def sign_up(self):
+        name = f'load-{uuid.uuid4().hex[:12]}'
+        self.call('POST', '/api/register', json={'username': name, 'email': f'{name}@example.com', 'password': 'load'}, expect=(201,))
+        if not self.call('POST', '/api/login', json={'username': name, 'password': 'load'}): return False
+        for cookie in self.http.cookies: cookie.secure = False # also works against servers with secure cookies
+        for ign in self.roster:
+            self.call('POST', '/api/team/add', json={'player_ign': ign}, expect=(201,))
+        return True
+
+    def upload(self):
+        players = [noisy_ign(self.rng, ign) if self.rng.random() < 0.3 else ign for ign in self.rng.sample(self.roster, 4)]
+        image = scoreboard_annotations(players, rank=self.rng.randint(1, 18), map_name=self.rng.choice(MAPS), seed=self.rng.randrange(1 << 30))
+        filename = f'Screenshot_{uuid.uuid4().hex[:16]}.png' # phones name every screenshot differently
+        if self.args.upload_mode == 'sync':
+            self.call('POST', '/api/upload-match-result', files={'file': (filename, image, 'image/png')}, expect=(201,))
+            return
+        response = self.call('POST', '/api/upload-jobs', files={'files': (filename, image, 'image/png')}, expect=(202,))
+        if not response: return
+        job_id = response.json()['jobs'][0]['id']
+        deadline = time.monotonic() + self.args.timeout
+        while time.monotonic() < deadline:
+            response = self.call('GET', f'/api/upload-jobs/{job_id}', route='/api/upload-jobs/<id>')
+            if not response or response.json()['status'] in ('done', 'failed'): return
+            time.sleep(0.2)
+
+    def browse(self):
+        response = self.call('GET', '/api/matches')
+        if response: self.match_ids = [m['id'] for m in response.json()]
+        if self.match_ids:
+            self.call('GET', f'/api/matches/{self.rng.choice(self.match_ids)}', route='/api/matches/<id>')
+
+    def dashboard(self):
+        self.call('GET', '/api/status')
+        self.call('GET', '/api/players')
+        self.call('GET', f'/api/stats/overview?player_ign={self.rng.choice(self.roster)}', route='/api/stats/overview')
+
+    def run(self, stop_at):
+        if not self.sign_up(): return 0
+        loops = 0
+        while time.monotonic() < stop_at:
+            for step in (self.upload, self.browse, self.dashboard):
+                step()
+                if self.args.think: time.sleep(self.rng.uniform(0, 2 * self.args.think))
+            loops += 1
+        return loops
+
+
+def _percentile(sorted_samples, q):
+    return sorted_samples[min(len(sorted_samples) - 1, int(round(q * (len(sorted_samples) - 1))))]
+
+
+def report(recorder, elapsed, args, loops):
+    routes = {}
+    for route, samples in sorted(recorder.samples.items()):
+        samples = sorted(samples)
+        routes[route] = {
+            'requests': len(samples), 'errors': recorder.errors[route],
+            'error_rate': round(recorder.errors[route] / len(samples), 4),
+            'rps': round(len(samples) / elapsed, 2),
+            'p50_ms': round(_percentile(samples, 0.50) * 1000, 1), 'p95_ms': round(_percentile(samples, 0.95) * 1000, 1),
+            'p99_ms': round(_percentile(samples, 0.99) * 1000, 1), 'max_ms': round(samples[-1] * 1000, 1),
+        }
+    total = sum(r['requests'] for r in routes.values())
+    errors = sum(r['errors'] for r in routes.values())
+    return {
+        'config': {'users': args.users, 'duration_sec': args.duration, 'ocr_latency_sec': args.ocr_latency,
+                   'upload_mode': args.upload_mode, 'think_sec': args.think, 'url': args.url or 'local'},
+        'elapsed_sec': round(elapsed, 2),
+        'requests': total, 'errors': errors, 'error_rate': round(errors / total, 4) if total else 0,
+        'throughput_rps': round(total / elapsed, 2), 'session_loops': loops,
+        'routes': routes,
+        'error_examples': recorder.error_examples,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=10, help='concurrent manager sessions')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run after start-up')
+    parser.add_argument('--ocr-latency', type=float, default=0.5, help='seconds each fake OCR call takes')
+    parser.add_argument('--upload-mode', choices=['sync', 'jobs'], default='sync', help='/upload-match-result or /upload-jobs + polling')
+    parser.add_argument('--think', type=float, default=0.0, help='mean pause between steps, seconds')
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--url', help='existing server to test instead of starting one')
+    parser.add_argument('--quiet-server', action='store_true', help="hide the local server's request log")
+    parser.add_argument('--output', help='also write the JSON report to this file')
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    server = None
+    base_url = args.url
+    if not base_url:
+        server, base_url = start_server(args, os.path.join(tmp.name, 'load.db'))
+    try:
+        recorder = Recorder()
+        loops = []
+        started = time.monotonic()
+        stop_at = started + args.duration
+
+        def user(n):
+            loops.append(ManagerSession(base_url, recorder, random.Random(args.seed * 100003 + n), args).run(stop_at))
+        threads = [threading.Thread(target=user, args=(n,)) for n in range(args.users)]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+        result = report(recorder, time.monotonic() - started, args, sum(loops))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+        tmp.cleanup()
+
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f: f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+"""Before/after query plans and timings for the hot-path indexes (migration 5).
+
+Seeds a database (see seed.py) unless it already holds data, then runs the
+statements the hot endpoints issue twice: once with the migration's indexes
+dropped (the schema before it) and once after add_hot_path_indexes() has
+recreated them. For each statement it reports the query plan and the median time.
+
+    python benchmarks/query_plans.py --managers 20 --matches 100000 --output plans.json
+
+The indexes are left in place afterwards. Plans come from EXPLAIN QUERY PLAN on
+SQLite and EXPLAIN on Postgres; both phases run ANALYZE first.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from seed import seed_database # noqa: E402
+from hot_paths import timed, _git_revision # noqa: E402
+
+# name -> (route it stands for, SQL); same shapes as the ORM emits
+QUERIES = {
+    'matches_page': ('GET /api/matches?limit=50',
+                     'SELECT id, match_date, map_name, team_rank FROM match_event WHERE uploaded_by_id = :manager_id '
+                     'ORDER BY match_date DESC, id DESC LIMIT 51'),
+    'matches_date_range': ('GET /api/matches?date_from=&date_to=, bulk delete by date',
+                           'SELECT id, match_date, map_name, team_rank FROM match_event WHERE uploaded_by_id = :manager_id '
+                           'AND match_date >= :date_from AND match_date < :date_to ORDER BY match_date DESC, id DESC'),
+    'page_performances': ('GET /api/matches (selectinload of one page)',
+                          'SELECT id, match_id, player_ign, kills, damage FROM performance_record WHERE match_id IN :match_ids'),
+    'player_in_match': ('POST /api/matches/<id>/performances duplicate check',
+                        'SELECT id FROM performance_record WHERE match_id = :match_id AND player_ign = :player_ign'),
+    'roster_lookup': ('POST /api/team/add, performance edits',
+                      'SELECT id FROM roster_player WHERE manager_id = :manager_id AND player_ign = :player_ign'),
+}
+
+
+def sample_params(conn):
+    from sqlalchemy import text, DateTime
+    manager_id = conn.execute(text("SELECT id FROM \"user\" WHERE username LIKE 'bench-manager-%' ORDER BY id")).scalar()
+    page = conn.execute(text('SELECT id, match_date FROM match_event WHERE uploaded_by_id = :m ORDER BY match_date DESC, id DESC LIMIT 50')
+                        .columns(match_date=DateTime), {'m': manager_id}).all()
+    match_id = page[len(page) // 2][0]
+    player_ign = conn.execute(text('SELECT player_ign FROM performance_record WHERE match_id = :m'), {'m': match_id}).scalar()
+    date_to = page[0][1]
+    return {'manager_id': manager_id, 'match_ids': [m for m, _ in page], 'match_id': match_id, 'player_ign': player_ign,
+            'date_from': date_to - timedelta(days=30), 'date_to': date_to}
+
+
+def _statement(sql, params):
+    from sqlalchemy import text, bindparam, DateTime
+    statement = text(sql)
+    if ':match_ids' in sql: statement = statement.bindparams(bindparam('match_ids', expanding=True))
+    if ':date_from' in sql: statement = statement.bindparams(bindparam('date_from', type_=DateTime), bindparam('date_to', type_=DateTime))
+    return statement, {k: v for k, v in params.items() if f':{k}' in sql}
+
+
+def query_plan(conn, sql, params):
+    explain = 'EXPLAIN QUERY PLAN ' if conn.dialect.name == 'sqlite' else 'EXPLAIN '
+    statement, bound = _statement(explain + sql, params)
+    return [row[-1] if conn.dialect.name == 'sqlite' else row[0] for row in conn.execute(statement, bound)]
+
+
+def measure(conn, params, repeat):
+    from sqlalchemy import text
+    conn.execute(text('ANALYZE'))
+    results = {}
+    for name, (_, sql) in QUERIES.items():
+        statement, bound = _statement(sql, params)
+        result = timed(lambda: conn.execute(statement, bound).all(), repeat)
+        result['plan'] = query_plan(conn, sql, params)
+        results[name] = result
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL'), help='default: a temporary SQLite file')
+    parser.add_argument('--managers', type=int, default=20)
+    parser.add_argument('--matches', type=int, default=100000, help='total seeded matches; rows = matches * (1 + players)')
+    parser.add_argument('--players', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='also write the JSON report to this file')
+    args = parser.parse_args()
+
+    tmp = None
+    if not args.database_url:
+        tmp = tempfile.TemporaryDirectory()
+        args.database_url = f"sqlite:///{os.path.join(tmp.name, 'plans.db')}"
+    os.environ.update(DATABASE_URL=args.database_url, SECRET_KEY=os.environ.get('SECRET_KEY', 'bench'), OCR_BACKEND='fake')
+
+    from app import create_app, db
+    from app.migrations import run_migrations, add_hot_path_indexes, HOT_PATH_INDEXES, _indexes
+    from sqlalchemy import text
+    import sqlalchemy
+
+    app = create_app()
+    with app.app_context():
+        run_migrations(echo=lambda *_: None)
+        seeded = None
+        if db.session.execute(text('SELECT COUNT(*) FROM match_event')).scalar() == 0:
+            started = time.perf_counter()
+            seeded = seed_database(args.managers, args.matches, args.players, seed=args.seed, echo=lambda m: print(m, file=sys.stderr))
+            seeded['seconds'] = round(time.perf_counter() - started, 1)
+        db.session.remove()
+
+        with db.engine.begin() as conn:
+            for table, name, _ in HOT_PATH_INDEXES:
+                if name in _indexes(conn, table): conn.execute(text(f'DROP INDEX {name}'))
+        with db.engine.connect() as conn:
+            params = sample_params(conn)
+            counts = {t: conn.execute(text(f'SELECT COUNT(*) FROM {t}')).scalar() for t in ('match_event', 'performance_record', 'roster_player')}
+            before = measure(conn, params, args.repeat)
+        with db.engine.begin() as conn:
+            started = time.perf_counter()
+            add_hot_path_indexes(conn, echo=lambda m: print(m, file=sys.stderr))
+            index_seconds = round(time.perf_counter() - started, 2)
+        with db.engine.connect() as conn:
+            after = measure(conn, params, args.repeat)
+        dialect = db.engine.dialect.name
+
+    results = {}
+    print(f"{'query':22} {'before ms':>10} {'after ms':>10} {'speedup':>8}", file=sys.stderr)
+    for name, (route, _) in QUERIES.items():
+        b, a = before[name]['median_ms'], after[name]['median_ms']
+        speedup = round(b / a, 1) if a else None
+        results[name] = {'route': route, 'before': before[name], 'after': after[name], 'speedup': speedup}
+        print(f'{name:22} {b:10.3f} {a:10.3f} {speedup or 0:7.1f}x', file=sys.stderr)
+
+    report = {
+        'meta': {
+            'revision': _git_revision(), 'python': platform.python_version(), 'sqlalchemy': sqlalchemy.__version__,
+            'database': dialect, 'rows': counts, 'seeded': seeded, 'repeat': args.repeat, 'seed': args.seed,
+            'index_build_seconds': index_seconds,
+            'params': {k: str(v) if k.startswith('date') else v for k, v in params.items() if k != 'match_ids'},
+        },
+        'results': results,
+    }
+    text_report = json.dumps(report, indent=2)
+    print(text_report)
+    if args.output:
+        with open(args.output, 'w') as f: f.write(text_report + '\n')
+    if tmp: tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
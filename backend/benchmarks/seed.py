@@ -0,0 +1,143 @@
+"""Synthetic data for benchmarks: managers with rosters, matches and performances.
+
+Seeds the database named by DATABASE_URL (SQLite or Postgres) through the same
+chunked insert path as bulk import, so tip codes, normalized IGNs and
+PlayerAggregate totals are all populated:
+
+    DATABASE_URL=sqlite:///bench.db python benchmarks/seed.py --managers 10 --matches 25000
+
+Rows written = matches * (1 + players per match). Every manager's password is
+"bench" and their username is bench-manager-<n>.
+"""
+import argparse
+import json
+import os
+import random
+import string
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MAPS = ['Erangel', 'Miramar', 'Sanhok', 'Vikendi', 'Livik']
+PASSWORD = 'bench'
+CHUNK_SIZE = 500
+
+
+def make_igns(rng, count):
+    """Plausible in-game names: mixed case, digits, the odd clan tag or non-ASCII letter."""
+    igns = set()
+    while len(igns) < count:
+        name = ''.join(rng.choice(string.ascii_letters + string.digits) for _ in range(rng.randint(4, 12)))
+        if rng.random() < 0.2: name = rng.choice(['TSM', 'GodL', 'OR', 'Ξ']) + name
+        if rng.random() < 0.05: name = name.replace('a', 'á')
+        igns.add(name)
+    return sorted(igns)
+
+
+def noisy_ign(rng, ign):
+    """An IGN as OCR might return it: a dropped, swapped or confusable character."""
+    chars = list(ign)
+    i = rng.randrange(len(chars))
+    op = rng.choice(['drop', 'swap', 'confuse', 'case'])
+    if op == 'drop' and len(chars) > 3: del chars[i]
+    elif op == 'swap' and i + 1 < len(chars): chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    elif op == 'confuse': chars[i] = {'O': '0', 'o': '0', 'l': '1', 'I': '1', 'S': '5', 'B': '8'}.get(chars[i], chars[i])
+    else: chars[i] = chars[i].swapcase()
+    return ''.join(chars)
+
+
+def performance_values(rng, ign, won):
+    kills = min(int(rng.expovariate(0.3)), 30)
+    return {
+        'player_ign': ign, 'kills': kills, 'assists': rng.randint(0, 6),
+        'damage': int(kills * rng.uniform(80, 160) + rng.uniform(0, 250)), 'revives': rng.randint(0, 4),
+        'survival_time_sec': float(rng.randint(60, 1800 if won else 1500)), 'recall': rng.randint(0, 2),
+        'rating': round(rng.uniform(20, 99), 1),
+    }
+
+
+def scoreboard_annotations(players, rank=1, map_name='Erangel', seed=0):
+    """One scoreboard screenshot as OCR annotations, in the FakeOCRBackend JSON format."""
+    rng = random.Random(seed)
+
+    def box(desc, x, y, w=60, h=20):
+        return {'description': desc, 'vertices': [[x, y], [x + w, y], [x + w, y + h], [x, y + h]]}
+
+    tokens = [box(f"#{rank}/18\nRanked Classic - {map_name}\n" + "\n".join(players), 0, 0)]
+    for i, header in enumerate(['Finishes', 'Assists', 'Damage', 'Survived', 'Rescue', 'Recall', 'Rating']):
+        tokens.append(box(header, 600 + i * 150, 100))
+    for row, ign in enumerate(players):
+        y = 200 + row * 80 + rng.randint(-5, 5)
+        tokens.append(box(ign, 100, y))
+        values = [str(rng.randint(0, 10)), str(rng.randint(0, 5)), str(rng.randint(0, 1500)), f"{rng.randint(1, 30)}.{rng.randint(0, 9)}m",
+                  str(rng.randint(0, 3)), str(rng.randint(0, 2)), f"{rng.randint(10, 99)}.{rng.randint(0, 9)}"]
+        for col, value in enumerate(values): tokens.append(box(value, 600 + col * 150 + rng.randint(-10, 10), y))
+    return json.dumps(tokens).encode()
+
+
+def seed_database(managers=5, matches=2000, players_per_match=4, roster_size=8, seed=0, echo=print):
+    """Seeds inside the current app context. Returns the row counts written."""
+    from app import db
+    from app.models import User, RosterPlayer
+    from app.bulk_import import _insert_chunk, ImportReport
+
+    rng = random.Random(seed)
+    template = User(username='template', email='template')
+    template.set_password(PASSWORD) # hashing is slow, so every manager shares one hash
+    password_hash = template.password_hash
+
+    report = ImportReport()
+    started = time.perf_counter()
+    start_date = datetime(2024, 1, 1)
+    for n in range(managers):
+        manager = User(username=f'bench-manager-{n}', email=f'bench-manager-{n}@example.com', password_hash=password_hash,
+                       bgmi_username=f'bench-{n}-{seed}')
+        db.session.add(manager)
+        db.session.flush()
+        roster = make_igns(rng, roster_size)
+        db.session.add_all(RosterPlayer(player_ign=ign, manager_id=manager.id) for ign in roster)
+        db.session.commit()
+
+        per_manager = matches // managers + (1 if n < matches % managers else 0)
+        minutes_per_match = max(1, int(365 * 24 * 60 / max(per_manager, 1)))
+        chunk = []
+        for i in range(per_manager):
+            rank = rng.choice([1, 1, 2, 3, 4, 5, 8, 12, 18])
+            chunk.append({
+                'map_name': rng.choice(MAPS), 'team_rank': rank,
+                'match_date': start_date + timedelta(minutes=i * minutes_per_match + rng.randint(0, minutes_per_match - 1)),
+                'performances': [performance_values(rng, ign, rank == 1) for ign in rng.sample(roster, min(players_per_match, len(roster)))],
+            })
+            if len(chunk) == CHUNK_SIZE:
+                _insert_chunk(manager.id, chunk, report)
+                chunk = []
+        if chunk: _insert_chunk(manager.id, chunk, report)
+        echo(f'manager {n + 1}/{managers}: {report.matches_imported} matches, {report.performances_imported} performances '
+             f'({time.perf_counter() - started:.1f}s)')
+    return {'managers': managers, 'matches': report.matches_imported, 'performances': report.performances_imported,
+            'rows': report.matches_imported + report.performances_imported}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--managers', type=int, default=5)
+    parser.add_argument('--matches', type=int, default=2000, help='total across all managers')
+    parser.add_argument('--players', type=int, default=4, help='performances per match')
+    parser.add_argument('--roster', type=int, default=8, help='roster size per manager')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    if not os.environ.get('DATABASE_URL'): parser.error('set DATABASE_URL to the database to seed')
+
+    from app import create_app
+    from app.migrations import run_migrations
+    app = create_app()
+    with app.app_context():
+        run_migrations()
+        counts = seed_database(args.managers, args.matches, args.players, args.roster, args.seed)
+    print(json.dumps(counts))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Cold-start benchmark: import time, create_app() time and first-request latency.
+
+Every run is a fresh interpreter, so nothing is warm. Prints JSON (medians over
+--runs) so results can be diffed between commits:
+
+    python benchmarks/startup.py --runs 10 --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the child process. Reports milliseconds for each phase, plus which heavy
+# modules were imported and whether create_app() touched the database.
+CHILD = r'''
+import json, os, sys, time
+t0 = time.perf_counter()
+from app import create_app, db
+t1 = time.perf_counter()
+app = create_app()
+t2 = time.perf_counter()
+schema_touched = os.path.exists(os.environ['BENCH_DB_PATH'])
+client = app.test_client()
+status = client.get('/api/status').status_code
+t3 = time.perf_counter()
+login = client.post('/api/login', json={'username': 'nobody', 'password': 'x'}).status_code
+t4 = time.perf_counter()
+print(json.dumps({
+    'import_ms': (t1 - t0) * 1000, 'create_app_ms': (t2 - t1) * 1000,
+    'first_request_ms': (t3 - t2) * 1000, 'first_db_request_ms': (t4 - t3) * 1000,
+    'total_ms': (t4 - t0) * 1000,
+    'statuses': [status, login],
+    'create_app_touched_db': schema_touched,
+    'heavy_modules_loaded': sorted(m for m in ('authlib', 'google.cloud.vision', 'pyarrow', 'redis') if m in sys.modules),
+}))
+'''
+
+PHASES = ['import_ms', 'create_app_ms', 'first_request_ms', 'first_db_request_ms', 'total_ms']
+
+
+def _env(db_path):
+    env = dict(os.environ)
+    env.update({
+        'DATABASE_URL': f'sqlite:///{db_path}', 'BENCH_DB_PATH': db_path,
+        'SECRET_KEY': env.get('SECRET_KEY', 'bench'), 'OCR_BACKEND': 'fake',
+        'RESPONSE_CACHE_URL': '',
+    })
+    return env
+
+
+def _run_child(db_path):
+    out = subprocess.run([sys.executable, '-c', CHILD], cwd=BACKEND_DIR, env=_env(db_path),
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def _migrate(db_path):
+    code = 'from app import create_app\nfrom app.migrations import run_migrations\napp = create_app()\nwith app.app_context(): run_migrations(echo=lambda *_: None)'
+    subprocess.run([sys.executable, '-c', code], cwd=BACKEND_DIR, env=_env(db_path), check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--output', help='also write the JSON report to this file')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        # One run against a missing database first: create_app() must not create it
+        cold = _run_child(os.path.join(tmp, 'absent.db'))
+        _migrate(db_path)
+        _run_child(db_path) # warm the OS file cache and bytecode so runs are comparable
+        runs = [_run_child(db_path) for _ in range(args.runs)]
+
+    report = {
+        'python': sys.version.split()[0],
+        'runs': args.runs,
+        'median': {k: round(statistics.median(r[k] for r in runs), 1) for k in PHASES},
+        'min': {k: round(min(r[k] for r in runs), 1) for k in PHASES},
+        'create_app_touched_db': cold['create_app_touched_db'],
+        'heavy_modules_loaded': runs[-1]['heavy_modules_loaded'],
+        'statuses': runs[-1]['statuses'],
+    }
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f: f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -14,4 +14,8 @@ else:
 app = create_app()
 
 if __name__ == '__main__':
+    # Dev server convenience; deployments run `flask migrate` explicitly
+    with app.app_context():
+        from app.migrations import run_migrations
+        run_migrations()
     app.run(debug=True)
\ No newline at end of file